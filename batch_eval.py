@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+"""
+Scoring many positions in one go with NumPy, with the same weights as `checkers.eval_game_state`
+(the default ones, or any `checkers.Evaluator`'s table).
+
+Positions come either as stacked bitboards, an (N, 3) array of (one, two, kings) masks as a
+`checkers.Bitboard` holds them, or as an (N, 8, 8) int8 array laid out like `Board.data` (see
+`board_array`). Scores are for player two, like `eval_game_state`'s, WIN and -WIN included.
+"""
+
+import numpy
+
+from checkers import Bitboard, Board, Checker, SQUARES, WEIGHTS, WIN, coords_to_square
+
+# piece codes in board arrays; player one's pieces are negative
+EMPTY = 0
+MAN = 1
+KING = 2
+
+SHIFTS = numpy.arange(32, dtype = numpy.uint32)
+KINDS = [(Checker.PLAYER_ONE, False), (Checker.PLAYER_ONE, True), (Checker.PLAYER_TWO, False), (Checker.PLAYER_TWO, True)]
+SQUARE_XS, SQUARE_YS = numpy.array(SQUARES).T
+
+def masks_array(bitboards):
+    """Stacks `Bitboard`s into an (N, 3) array of masks."""
+    return numpy.array([(b.one, b.two, b.kings) for b in bitboards], dtype = numpy.uint32).reshape(-1, 3)
+
+def board_array(boards):
+    """Converts `Board`s into an (N, 8, 8) int8 array of piece codes."""
+    arrays = numpy.zeros((len(boards), 8, 8), dtype = numpy.int8)
+    for n, board in enumerate(boards):
+        for x, y in SQUARES:
+            piece = board.data[x][y]
+            if piece is not None:
+                code = KING if piece.king else MAN
+                arrays[n, x, y] = code if piece.player == Checker.PLAYER_TWO else -code
+    return arrays
+
+def game_masks(moves):
+    """
+    The masks of every position in a game, from the start up to and including the final one,
+    given its moves as lists of A0-style coordinates (as `selfplay` writes them).
+    """
+    bitboard = Bitboard.from_board(Board())
+    positions = [bitboard.copy()]
+    for ply, move in enumerate(moves):
+        bitboard.make(Checker.PLAYER_ONE if ply % 2 == 0 else Checker.PLAYER_TWO, tuple(coords_to_square(c) for c in move))
+        positions.append(bitboard.copy())
+    return masks_array(positions)
+
+def finish(scores, one, two):
+    """Replaces the scores of positions where a side has no pieces left, the way `eval_game_state` does."""
+    scores = numpy.where(two == 0, -WIN, scores)
+    return numpy.where(one == 0, WIN, scores)
+
+def square_weights(weights):
+    """A weights table (see `checkers.Evaluator.table`) as a (4, 32) array, one row for each of KINDS."""
+    return numpy.array([weights[kind] for kind in KINDS], dtype = numpy.float64)
+
+def kinds_array(masks):
+    """Splits an (N, 3) array of masks into an (N, 4, 32) bool array: which squares hold each of KINDS."""
+    masks = numpy.asarray(masks, dtype = numpy.uint32).reshape(-1, 3)
+    bits = ((masks[:, :, None] >> SHIFTS) & 1).astype(bool)
+    one, two, kings = bits[:, 0], bits[:, 1], bits[:, 2]
+    return numpy.stack([one & ~kings, one & kings, two & ~kings, two & kings], axis = 1)
+
+def evaluate_kinds(kinds, weights):
+    """Scores an (N, 4, 32) array of `kinds_array`'s."""
+    scores = numpy.einsum('nks,ks->n', kinds.astype(numpy.float64), square_weights(weights))
+    return finish(scores, kinds[:, 0:2].sum(axis = (1, 2)), kinds[:, 2:4].sum(axis = (1, 2)))
+
+def evaluate_masks(masks, weights = WEIGHTS):
+    """Scores an (N, 3) array of (one, two, kings) masks. Returns N float64 scores."""
+    return evaluate_kinds(kinds_array(masks), weights)
+
+def evaluate_arrays(arrays, weights = WEIGHTS):
+    """Scores an (N, 8, 8) array of piece codes. Returns N float64 scores."""
+    arrays = numpy.asarray(arrays, dtype = numpy.int8).reshape(-1, 8, 8)
+    squares = arrays[:, SQUARE_XS, SQUARE_YS]
+    kinds = numpy.stack([squares == -MAN, squares == -KING, squares == MAN, squares == KING], axis = 1)
+    return evaluate_kinds(kinds, weights)
+
+def evaluate_boards(boards, weights = WEIGHTS):
+    """Scores a list of `Board`s."""
+    return evaluate_arrays(board_array(boards), weights)
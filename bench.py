@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+
+"""
+Benchmarks: perft move-generation counts and timed fixed-depth searches over a set of test
+positions, compared against a stored baseline so that wrong counts and slowdowns stand out.
+
+Perft counts must match the baseline exactly, and searches should pick the same moves and scores
+after the same number of nodes. The baseline holds only these, which are the same on every machine.
+Speeds aren't: to catch slowdowns, save a speed baseline on the machine the comparisons are made on
+(`--save-speed`, to an untracked file) and compare with it (`--speed`), where nodes/sec may drop by
+up to a tolerance before it counts as a regression.
+"""
+
+import json
+import os
+import sys
+import time
+
+from checkers import ORDERINGS, Bitboard, Board, Checker, MoveOrdering, coords_to_square, get_best_move, get_square_moves, move_to_coords, opponent
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+DEFAULT_SPEED_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_speed.json')
+DEFAULT_PERFT_DEPTH = 6
+DEFAULT_SEARCH_DEPTH = 8
+DEFAULT_TOLERANCE = 0.2
+
+def position(one = '', two = '', kings = ''):
+    """Sets up a board from space-separated A0-style coordinates of each side's pieces and of the kings among them."""
+    masks = [0, 0, 0]
+    for i, squares in enumerate([one, two, kings]):
+        for coords in squares.split():
+            masks[i] |= 1 << coords_to_square(coords)
+    return Bitboard(*masks).to_board()
+
+# name: (board, player to move)
+POSITIONS = {
+    'start': (Board(), Checker.PLAYER_ONE),
+    # A1 can take three in a row, and branch at C3
+    'multi-jump': (position(one = 'A1 E1 G1', two = 'B2 B4 D4 F6 H6'), Checker.PLAYER_ONE),
+    # C5 is crowned jumping D6 and, as a king, carries on over F6
+    'crowning': (position(one = 'C5 B0 H2', two = 'D6 F6 C1 G3'), Checker.PLAYER_ONE),
+    'kings': (position(one = 'B0 C3 E3', two = 'D6 F4 G7', kings = 'C3 E3 D6 F4'), Checker.PLAYER_TWO),
+    'midgame': (position(one = 'B0 D0 A1 C1 E1 D2 H2 G3', two = 'A3 D4 A5 H6 A7 C7 E7 G7'), Checker.PLAYER_ONE),
+}
+# the positions with enough choice in them to be worth timing searches of
+SEARCH_POSITIONS = ['start', 'midgame']
+
+def perft(board, player, depth):
+    """Counts the positions `depth` plies from `board` with `player` to move (games that end sooner count once)."""
+    if depth == 0: return 1
+    moves = get_square_moves(board, player)
+    if len(moves) == 0: return 1
+    if depth == 1: return len(moves)
+    total = 0
+    for move in moves:
+        record = board.apply(player, move)
+        total += perft(board, opponent(player), depth - 1)
+        board.undo(record)
+    return total
+
+def run_perft(depth, positions = POSITIONS):
+    """Returns {name: [perft(1), ..., perft(depth)]} for every test position, and the time it took."""
+    start = time.perf_counter()
+    counts = {}
+    for name, (board, player) in positions.items():
+        counts[name] = [perft(board.deepcopy(), player, d) for d in range(1, depth + 1)]
+    return counts, time.perf_counter() - start
+
+def run_search(depth, repeat = 3, ordering = 'full', positions = SEARCH_POSITIONS):
+    """
+    Times `get_best_move` to a fixed `depth` on the named test positions, keeping the fastest of `repeat` runs.
+    `ordering` names the move ordering to search with (see `checkers.ORDERINGS`).
+    Returns {name: {'move', 'score', 'nodes', 'seconds', 'nodes_per_second'}}.
+    """
+    results = {}
+    for name in positions:
+        board, player = POSITIONS[name]
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = get_best_move(board.deepcopy(), player, depth, ordering = MoveOrdering(**ORDERINGS[ordering]))
+            seconds = time.perf_counter() - start
+            if best is None or seconds < best[1]: best = result, seconds
+        result, seconds = best
+        results[name] = {
+            'move': move_to_coords(result.move) if result.move is not None else None,
+            'score': result.score,
+            'nodes': result.nodes,
+            'seconds': seconds,
+            'nodes_per_second': result.nodes / seconds if seconds > 0 else 0.0,
+        }
+    return results
+
+def deterministic(report):
+    """A report (as made by `run`) without its timings, which differ from machine to machine."""
+    return {
+        'perft_depth': report['perft_depth'],
+        'perft': report['perft'],
+        'search_depth': report['search_depth'],
+        'ordering': report['ordering'],
+        'search': {name: {field: result[field] for field in ['move', 'score', 'nodes']} for name, result in report['search'].items()},
+    }
+
+def compare(report, baseline, tolerance = DEFAULT_TOLERANCE, speeds = None):
+    """
+    Compares a report against a baseline (both as made by `run`, the baseline perhaps `deterministic`).
+    Returns a list of (level, message) where level is 'WRONG' (perft counts differ), 'CHANGED' (the
+    search picked a different move or score, or searched a different number of nodes) or, only if
+    `speeds` (a full report from this machine) is given, 'SLOWER' (nodes/sec dropped by more than `tolerance`).
+    """
+    flags = []
+    for name, counts in report['perft'].items():
+        expected = baseline.get('perft', {}).get(name)
+        if expected is None: continue
+        for depth, (got, want) in enumerate(zip(counts, expected), 1):
+            if got != want: flags.append(('WRONG', '%s perft(%i) = %i, baseline %i' % (name, depth, got, want)))
+    if same_search(report, baseline):
+        for name, result in report['search'].items():
+            expected = baseline.get('search', {}).get(name)
+            if expected is None: continue
+            for field in ['move', 'score', 'nodes']:
+                if result[field] != expected[field]:
+                    flags.append(('CHANGED', '%s %s = %s, baseline %s' % (name, field, result[field], expected[field])))
+    if speeds is not None and same_search(report, speeds):
+        for name, result in report['search'].items():
+            expected = speeds.get('search', {}).get(name)
+            if expected is None or 'nodes_per_second' not in expected: continue
+            if result['nodes_per_second'] < expected['nodes_per_second'] * (1 - tolerance):
+                flags.append(('SLOWER', '%s %.0f nodes/sec, baseline %.0f' % (name, result['nodes_per_second'], expected['nodes_per_second'])))
+    return flags
+
+def same_search(report, baseline):
+    """Were the searches in `report` and `baseline` made to the same depth with the same ordering?"""
+    return (report['search_depth'], report['ordering']) == (baseline.get('search_depth'), baseline.get('ordering', 'full'))
+
+def run(perft_depth = DEFAULT_PERFT_DEPTH, search_depth = DEFAULT_SEARCH_DEPTH, repeat = 3, ordering = 'full'):
+    """Runs the whole benchmark. Returns a report that can be saved as a baseline."""
+    counts, perft_seconds = run_perft(perft_depth)
+    return {
+        'perft_depth': perft_depth,
+        'perft': counts,
+        'perft_seconds': perft_seconds,
+        'search_depth': search_depth,
+        'ordering': ordering,
+        'search': run_search(search_depth, repeat, ordering),
+    }
+
+def add_arguments(parser):
+    """Adds the `bench` command's options to an argparse parser."""
+    parser.add_argument('--perft-depth', type = int, default = DEFAULT_PERFT_DEPTH, help = 'count moves this many plies deep')
+    parser.add_argument('--search-depth', type = int, default = DEFAULT_SEARCH_DEPTH, help = 'time searches this many plies deep')
+    parser.add_argument('--repeat', type = int, default = 3, help = 'time each search this many times and keep the fastest')
+    parser.add_argument('--ordering', choices = sorted(ORDERINGS), default = 'full', help = 'move ordering to search with (default %(default)s)')
+    parser.add_argument('--baseline', default = DEFAULT_BASELINE, help = 'baseline JSON file to compare with (default %(default)s)')
+    parser.add_argument('--save', action = 'store_true', help = 'write the counts, moves and scores to the baseline file instead of comparing')
+    parser.add_argument('--speed', action = 'store_true', help = 'also compare nodes/sec with the speed baseline saved on this machine')
+    parser.add_argument('--speed-baseline', default = DEFAULT_SPEED_BASELINE, help = 'speed baseline JSON file, not tracked (default %(default)s)')
+    parser.add_argument('--save-speed', action = 'store_true', help = 'write the results, timings included, to the speed baseline file')
+    parser.add_argument('--tolerance', type = float, default = DEFAULT_TOLERANCE, help = 'fraction of nodes/sec that may be lost before it counts as a regression')
+
+def run_command(args):
+    """Runs the `bench` command; exits with status 1 if anything is wrong or slower than the baseline."""
+    report = run(args.perft_depth, args.search_depth, args.repeat, args.ordering)
+    for name, counts in report['perft'].items():
+        print('perft %-12s %s' % (name, ' '.join(str(n) for n in counts)))
+    print('perft took %.2fs' % report['perft_seconds'])
+    for name, result in report['search'].items():
+        print('search %-11s %s depth %i: %-16s score %6.2f  %7i nodes  %6.3fs  %8.0f nodes/sec' % (name, report['ordering'], report['search_depth'],
+            '-'.join(result['move'] or []), result['score'], result['nodes'], result['seconds'], result['nodes_per_second']))
+
+    saves = [(args.save, args.baseline, deterministic(report)), (args.save_speed, args.speed_baseline, report)]
+    for save, path, data in saves:
+        if not save: continue
+        with open(path, 'w') as f:
+            json.dump(data, f, indent = 2)
+            f.write('\n')
+        print('saved %s' % path)
+    if args.save or args.save_speed: return
+    if not os.path.exists(args.baseline):
+        print('no baseline at %s (use --save to make one)' % args.baseline, file = sys.stderr)
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    speeds = None
+    if args.speed:
+        if not os.path.exists(args.speed_baseline):
+            print('no speed baseline at %s (use --save-speed to make one)' % args.speed_baseline, file = sys.stderr)
+        else:
+            with open(args.speed_baseline) as f:
+                speeds = json.load(f)
+    flags = compare(report, baseline, args.tolerance, speeds)
+    for level, message in flags:
+        print('%s: %s' % (level, message))
+    if any(level != 'CHANGED' for level, _ in flags): sys.exit(1)
+    if len(flags) == 0: print('matches the baseline')
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+"""
+Opening books: moves for the first few plies, worked out ahead of time by deep searches.
+
+A book file is a header followed by fixed-size records sorted by position key (see
+`checkers.position_key`); each record is one move for that position with its score and weight.
+The file is memory-mapped and binary-searched, so opening it and looking a position up are cheap.
+"""
+
+import mmap
+import struct
+import sys
+
+from checkers import Board, Checker, Engine, INFINITY, get_square_moves, opponent, position_key
+
+MAGIC = b'CKOB'
+VERSION = 1
+HEADER = struct.Struct('<4sHI')    # magic, version, number of records
+RECORD = struct.Struct('<QQfH')    # position key, move, score, weight
+
+DEFAULT_PATH = 'opening.book'
+DEFAULT_PLIES = 6
+DEFAULT_DEPTH = 8
+
+def pack_move(move):
+    """Packs a move (up to 12 squares) into an int: 4 bits of length, then 5 bits per square."""
+    value = len(move)
+    for i, square in enumerate(move):
+        value |= square << (4 + 5 * i)
+    return value
+
+def unpack_move(value):
+    """The inverse of `pack_move`."""
+    return tuple((value >> (4 + 5 * i)) & 31 for i in range(value & 15))
+
+class OpeningBook:
+    """A book file made by `build`, memory-mapped."""
+
+    # constructor
+    def __init__(self, path):
+        """Opens a book file."""
+        self.path = path
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+        magic, version, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION: raise ValueError('%s is not an opening book' % path)
+
+    def record(self, i):
+        return RECORD.unpack_from(self.data, HEADER.size + i * RECORD.size)
+
+    def moves(self, board, player):
+        """Returns the book moves for `player` on `board` as a list of (move, score, weight), best first."""
+        key = position_key(board, player)
+        # binary search for the first record with this key
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.record(middle)[0] < key: low = middle + 1
+            else: high = middle
+        found = []
+        while low < self.count:
+            record = self.record(low)
+            if record[0] != key: break
+            found.append((unpack_move(record[1]), record[2], record[3]))
+            low += 1
+        found.sort(key = lambda entry: -entry[2])
+        return found
+
+    def choose(self, board, player):
+        """Returns the book's favourite (move, score) for `player` on `board`, or None if the position isn't in it."""
+        found = self.moves(board, player)
+        return found[0][:2] if len(found) > 0 else None
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+def score_moves(engine, board, player, depth):
+    """Scores every move for `player` with a full-window search `depth` plies deep. Returns [(move, score)]."""
+    engine.table.new_search()
+    scored = []
+    for move in get_square_moves(board, player):
+        record = board.apply(player, move)
+        scored.append((move, -engine.negamax(board, opponent(player), depth - 1, -INFINITY, INFINITY, 1)))
+        board.undo(record)
+    return scored
+
+def build(path, plies = DEFAULT_PLIES, depth = DEFAULT_DEPTH, margin = 0.5, progress = None):
+    """
+    Builds a book by searching every position reached in the first `plies` plies from the start,
+    `depth` plies deep. Moves scoring within `margin` of the best are kept (weighted by how close
+    they came) and followed further; the rest are dropped.
+    """
+    engine = Engine()
+    records = {}
+    frontier = [([], Checker.PLAYER_ONE)]
+    for ply in range(plies):
+        following = []
+        for line, player in frontier:
+            board = Board()
+            for i, move in enumerate(line):
+                board.apply(Checker.PLAYER_ONE if i % 2 == 0 else Checker.PLAYER_TWO, move)
+            key = position_key(board, player)
+            if key in records: continue
+
+            scored = score_moves(engine, board, player, depth)
+            if len(scored) == 0: continue
+            best = max(score for _, score in scored)
+            records[key] = []
+            for move, score in scored:
+                if best - score > margin: continue
+                weight = 1000 if margin == 0 else int(1 + 999 * (1 - (best - score) / margin))
+                records[key].append((pack_move(move), score, weight))
+                following.append((line + [move], opponent(player)))
+        frontier = following
+        if progress is not None: progress(ply + 1, len(records))
+
+    rows = sorted((key, move, score, weight) for key, moves in records.items() for move, score, weight in moves)
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(rows)))
+        for row in rows:
+            f.write(RECORD.pack(*row))
+
+def add_arguments(parser):
+    """Adds the `book` command's options to an argparse parser."""
+    parser.add_argument('-o', '--output', default = DEFAULT_PATH, help = 'file to write the book to (default %s)' % DEFAULT_PATH)
+    parser.add_argument('--plies', type = int, default = DEFAULT_PLIES, help = 'how many plies from the start the book covers')
+    parser.add_argument('--depth', type = int, default = DEFAULT_DEPTH, help = 'how deep each position is searched')
+    parser.add_argument('--margin', type = float, default = 0.5, help = 'keep moves scoring at most this much below the best')
+
+def run_command(args):
+    """Runs the `book` command."""
+    def progress(ply, positions):
+        print('ply %i: %i positions' % (ply, positions), file = sys.stderr)
+    build(args.output, args.plies, args.depth, args.margin, progress)
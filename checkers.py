@@ -1,5 +1,24 @@
 #!/usr/bin/env python3
 
+import argparse
+import collections
+import concurrent.futures
+import json
+import os
+import random
+import struct
+import sys
+import time
+
+# search constants
+WIN = 1337 # large value so that victory/defeat outweighs anything
+INFINITY = float('inf')
+DEFAULT_DEPTH = 6
+DEFAULT_QUIESCENCE = 8
+MAX_DEPTH = 64
+MAX_PLY = 128
+ROOT_TIE_MARGIN = 1e-6
+
 class Checker:
     """The checkers piece."""
 
@@ -31,10 +50,17 @@ class Board:
     def __init__(self, blank = False):
         """Constructs a new, normal set up board (if `blank` is False or left out)."""
         self.data = []
+        self.key = 0
+        self.pieces = 0
+        self.counts = {Checker.PLAYER_ONE: 0, Checker.PLAYER_TWO: 0}
+        self.score = 0
+        # what `score` is kept by: an `Evaluator`'s table (see `set_weights`)
+        self.weights = WEIGHTS
         if not blank:
             self.data.extend(Board.start_rows(Checker.PLAYER_ONE))
             self.data.extend(Board.empty_rows(2))
             self.data.extend(Board.start_rows(Checker.PLAYER_TWO))
+            self.rehash()
 
     @staticmethod
     def start_rows(player):
@@ -52,21 +78,10 @@ class Board:
         return [[None] * 8 for _ in range(count)]
 
     def render(self, player):
-        """Returns an ASCII representation of the board."""
-
-        if player is Checker.PLAYER_TWO:
-            s = '   A B C D E F G H \n'
-            for n, row in enumerate(self.data):
-                s += '  +-+-+-+-+-+-+-+-+\n'
-                s += '%i |%s|\n' % (n, '|'.join([Checker.character(p) for p in row]))
-        else:
-            s = '   H G F E D C B A \n'
-            for n in range(len(self.data)):
-                row = self.data[len(self.data)-n-1]
-                s += '  +-+-+-+-+-+-+-+-+\n'
-                s += ('\n|%s| %i' % ('|'.join([Checker.character(p) for p in row]), len(self.data)-n-1))[::-1]
-        s += '  +-+-+-+-+-+-+-+-+'
-        return s
+        """Returns an ASCII representation of the board, as seen by `player`."""
+        template, cells, _ = RENDER_TEMPLATES[player]
+        data = self.data
+        return template % tuple([Checker.character(data[x][y]) for x, y in cells])
 
     def move(self, player, from_coords, to_coords):
         """
@@ -96,6 +111,7 @@ class Board:
         if adx == ady == 1:
             self.data[to_x][to_y], self.data[from_x][from_y] = from_piece, None
             if to_x == 0 or to_x == 7: self.data[to_x][to_y].king = True
+            self.rehash()
             return True, self
         elif adx == ady == 2:
             jumped_x, jumped_y = (from_x + to_x) // 2, (from_y + to_y) // 2
@@ -108,30 +124,501 @@ class Board:
                 self.data[to_x][to_y], self.data[from_x][from_y] = from_piece, None
                 self.data[jumped_x][jumped_y] = None
                 if to_x == 0 or to_x == 7: self.data[to_x][to_y].king = True
+                self.rehash()
                 return True, self
         else:
             return False, 'That\'s not a diagonal move!'
 
+    def apply(self, player, move):
+        """
+        Plays a known-legal move (a tuple of square indices, more than two for multiple jumps) in place.
+        Nothing is validated or copied; returns an undo record to hand to `undo`:
+        (from, to, piece, was_king, captured, key, score) where `captured` is a list of (x, y, piece)
+        and `key` and `score` are from before the move.
+        """
+        from_x, from_y = SQUARES[move[0]]
+        to_x, to_y = SQUARES[move[-1]]
+        piece = self.data[from_x][from_y]
+        key = self.key ^ ZOBRIST[player, piece.king][move[0]]
+        weights = self.weights
+        score = self.score - weights[player, piece.king][move[0]]
+        captured = []
+        crowned = piece.king
+        for a, b in zip(move, move[1:]):
+            if abs((a >> 2) - (b >> 2)) == 2:
+                over = JUMPED[a, b]
+                jumped_x, jumped_y = SQUARES[over]
+                jumped_piece = self.data[jumped_x][jumped_y]
+                key ^= ZOBRIST[jumped_piece.player, jumped_piece.king][over]
+                score -= weights[jumped_piece.player, jumped_piece.king][over]
+                captured.append((jumped_x, jumped_y, jumped_piece))
+                self.data[jumped_x][jumped_y] = None
+            if b < 4 or b > 27: crowned = True
+        record = ((from_x, from_y), (to_x, to_y), piece, piece.king, captured, self.key, self.score)
+        self.data[from_x][from_y] = None
+        self.data[to_x][to_y] = piece
+        piece.king = crowned
+        self.key = key ^ ZOBRIST[player, crowned][move[-1]]
+        self.score = score + weights[player, crowned][move[-1]]
+        if captured:
+            self.pieces -= len(captured)
+            self.counts[captured[0][2].player] -= len(captured)
+        return record
+
+    def undo(self, record):
+        """Takes back a move made by `apply`."""
+        (from_x, from_y), (to_x, to_y), piece, was_king, captured, self.key, self.score = record
+        self.data[to_x][to_y] = None
+        self.data[from_x][from_y] = piece
+        piece.king = was_king
+        for x, y, captured_piece in captured:
+            self.data[x][y] = captured_piece
+        if captured:
+            self.pieces += len(captured)
+            self.counts[captured[0][2].player] += len(captured)
+
+    def rehash(self):
+        """
+        Recomputes the running state that `apply` and `undo` keep up to date: `key`, the Zobrist key
+        of the pieces (the side to move is not part of it), `pieces` and `counts`, the number of pieces
+        on the board in all and for each player, and `score`, the material and position part of `eval_game_state`.
+        """
+        self.key = 0
+        self.pieces = 0
+        self.counts = {Checker.PLAYER_ONE: 0, Checker.PLAYER_TWO: 0}
+        self.score = 0
+        for square, (x, y) in enumerate(SQUARES):
+            piece = self.data[x][y]
+            if piece is not None:
+                self.key ^= ZOBRIST[piece.player, piece.king][square]
+                self.score += self.weights[piece.player, piece.king][square]
+                self.pieces += 1
+                self.counts[piece.player] += 1
+
     def deepcopy(self):
         copied = Board(True)
         copied.data = [[Checker.deepcopy(piece) for piece in row] for row in self.data]
+        copied.key = self.key
+        copied.pieces = self.pieces
+        copied.counts = dict(self.counts)
+        copied.score = self.score
+        copied.weights = self.weights
         return copied
 
-def comp_move(board, player, move):
+    def set_weights(self, weights):
+        """Keeps `score` by another `Evaluator`'s table from now on."""
+        self.weights = weights
+        self.rehash()
+
+def square_to_xy(square):
+    """Converts a dark square index (0-31) to (x, y) board coordinates."""
+    x = square >> 2
+    return x, 2 * (square & 3) + 1 - (x & 1)
+
+def xy_to_square(x, y):
+    """Converts (x, y) board coordinates of a dark square to its index (0-31)."""
+    return 4 * x + y // 2
+
+def square_to_coords(square):
+    """Converts a dark square index to A0-style coordinates."""
+    return xy_to_coords(*square_to_xy(square))
+
+def coords_to_square(coords):
+    """Converts A0-style coordinates of a dark square to its index."""
+    return xy_to_square(int(coords[1]), 'ABCDEFGH'.index(coords[0]))
+
+def move_to_coords(move):
+    """Converts a move (tuple of square indices) to a list of A0-style coordinates."""
+    return [square_to_coords(square) for square in move]
+
+def build_tables():
+    """
+    Precomputes, for every dark square and kind of piece (keyed by (player, king)):
+    MOVE_TABLE[kind][square] = [(to, to_x, to_y), ...] and
+    JUMP_TABLE[kind][square] = [(over_x, over_y, to, to_x, to_y), ...],
+    plus JUMPED[from, to] = the square jumped over.
+    """
+    directions = {
+        (Checker.PLAYER_ONE, False): [(1, -1), (1, 1)],
+        (Checker.PLAYER_TWO, False): [(-1, -1), (-1, 1)],
+        (Checker.PLAYER_ONE, True): [(1, -1), (1, 1), (-1, -1), (-1, 1)],
+        (Checker.PLAYER_TWO, True): [(1, -1), (1, 1), (-1, -1), (-1, 1)],
+    }
+    move_table, jump_table, jumped = {}, {}, {}
+    for kind, steps in directions.items():
+        move_table[kind], jump_table[kind] = [], []
+        for x, y in SQUARES:
+            moves, jumps = [], []
+            for dx, dy in steps:
+                if 0 <= x + dx < 8 and 0 <= y + dy < 8:
+                    moves.append((xy_to_square(x + dx, y + dy), x + dx, y + dy))
+                if 0 <= x + 2 * dx < 8 and 0 <= y + 2 * dy < 8:
+                    to = xy_to_square(x + 2 * dx, y + 2 * dy)
+                    jumps.append((x + dx, y + dy, to, x + 2 * dx, y + 2 * dy))
+                    jumped[xy_to_square(x, y), to] = xy_to_square(x + dx, y + dy)
+            move_table[kind].append(moves)
+            jump_table[kind].append(jumps)
+    return move_table, jump_table, jumped
+
+class Evaluator:
+    """
+    The weights `eval_game_state` scores positions by, which can be read from a JSON file, e.g.
+    {"man": 1.0, "man_edge": 1.0, "man_advance": 0.0, "king": 5.0, "king_edge": 0.0}
+    (the defaults). A man is worth `man`, plus `man_edge` for each ring of squares it is out from the
+    middle four and `man_advance` for each row it has moved forward; a king is worth `king`, plus
+    `king_edge` for each ring out. Weights left out keep their default, and all of them are rounded
+    to multiples of RESOLUTION. No position may score as much as a win: twelve of the most valuable
+    piece must be worth less than WIN - MAX_PLY.
+    """
+
+    # constants (Evaluator._____)
+    DEFAULTS = {'man': 1.0, 'man_edge': 1.0, 'man_advance': 0.0, 'king': 5.0, 'king_edge': 0.0}
+    # a power of two, so that `Board`'s running score adds up exactly in whatever order pieces come and go
+    RESOLUTION = 1 / 256
 
-    message = board.move(player, move[0], move[1])
-    
-    board = message[1]
+    # constructor
+    def __init__(self, weights = None):
+        """Constructs an evaluator from a dict of weights; raises ValueError for any it doesn't know."""
+        unknown = set(weights or {}) - set(Evaluator.DEFAULTS)
+        if unknown: raise ValueError('Unknown evaluation weights: %s' % ', '.join(sorted(unknown)))
+        weights = dict(Evaluator.DEFAULTS, **(weights or {}))
+        self.weights = {name: round(float(w) / Evaluator.RESOLUTION) * Evaluator.RESOLUTION for name, w in weights.items()}
+        self.table = self.build_table()
+        # beyond this, the search would take a lead in material for a forced win
+        if 12 * max(abs(value) for values in self.table.values() for value in values) >= WIN - MAX_PLY:
+            raise ValueError('Evaluation weights too large: a position could score as much as a win')
 
-    # handle multiple jumps
-    for i in range(2, len(move)):
-        message = board.move(player, move[i-1], move[i])
-        if message[0]:
-            board = message[1]
+    @staticmethod
+    def load(path):
+        with open(path) as f:
+            return Evaluator(json.load(f))
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.weights, f, indent = 2)
+            f.write('\n')
+
+    @staticmethod
+    def ring(x, y):
+        """How many rings of squares (x, y) is out from the middle four: 0 to 3."""
+        return int(max(abs(x - 3.5), abs(y - 3.5)))
+
+    def build_table(self):
+        """
+        What each piece is worth on each square, the way `Board` keeps its running score:
+        table[player, king][square], with player one's pieces counting negative.
+        """
+        w = self.weights
+        table = {}
+        for player, sign in [(Checker.PLAYER_ONE, -1), (Checker.PLAYER_TWO, 1)]:
+            table[player, False] = [sign * (w['man'] + w['man_edge'] * Evaluator.ring(x, y) +
+                                            w['man_advance'] * (x if player == Checker.PLAYER_ONE else 7 - x)) for x, y in SQUARES]
+            table[player, True] = [sign * (w['king'] + w['king_edge'] * Evaluator.ring(x, y)) for x, y in SQUARES]
+        return table
+
+    def __eq__(self, other):
+        return isinstance(other, Evaluator) and self.weights == other.weights
+
+def build_render_templates():
+    """
+    Precomputes how `Board.render` lays the board out for each player: RENDER_TEMPLATES[player] =
+    (template, cells, places), where the template has a %s for each dark square, `cells` gives the
+    (x, y) of each %s in order and places[square] is the (line, column) its glyph ends up at.
+    Player two sees row 0 at the top and column A on the left; player one sees it turned around.
+    """
+    templates = {}
+    for player in [Checker.PLAYER_ONE, Checker.PLAYER_TWO]:
+        rows = range(8) if player == Checker.PLAYER_TWO else range(7, -1, -1)
+        columns = range(8) if player == Checker.PLAYER_TWO else range(7, -1, -1)
+        lines = ['   ' + ' '.join('ABCDEFGH'[y] for y in columns) + ' ']
+        cells, places = [], [None] * 32
+        for x in rows:
+            lines.append('  +-+-+-+-+-+-+-+-+')
+            line = '%i |' % x
+            for column, y in enumerate(columns):
+                if (x + y) % 2:
+                    places[xy_to_square(x, y)] = (len(lines), 3 + 2 * column)
+                    cells.append((x, y))
+                    line += '%s|'
+                else:
+                    line += ' |'
+            lines.append(line)
+        lines.append('  +-+-+-+-+-+-+-+-+')
+        templates[player] = '\n'.join(lines), cells, places
+    return templates
+
+def build_zobrist(seed = 0x636865636b657273):
+    """
+    Random 64-bit keys for Zobrist hashing: ZOBRIST[player, king][square] for pieces,
+    and ZOBRIST_SIDE, which is mixed in when player two is to move.
+    The seed is fixed so keys (and anything stored by key) are the same on every run.
+    """
+    rng = random.Random(seed)
+    keys = {}
+    for kind in [(Checker.PLAYER_ONE, False), (Checker.PLAYER_ONE, True), (Checker.PLAYER_TWO, False), (Checker.PLAYER_TWO, True)]:
+        keys[kind] = [rng.getrandbits(64) for _ in range(32)]
+    return keys, rng.getrandbits(64)
+
+def position_key(board, player):
+    """The Zobrist key of a position: the pieces on `board` with `player` to move."""
+    return board.key ^ ZOBRIST_SIDE if player == Checker.PLAYER_TWO else board.key
+
+SQUARES = [square_to_xy(square) for square in range(32)]
+MOVE_TABLE, JUMP_TABLE, JUMPED = build_tables()
+ZOBRIST, ZOBRIST_SIDE = build_zobrist()
+DEFAULT_EVALUATOR = Evaluator()
+WEIGHTS = DEFAULT_EVALUATOR.table
+RENDER_TEMPLATES = build_render_templates()
+
+class Bitboard:
+    """
+    A compact board: three 32-bit masks, one bit per dark square.
+    Bit `4 * x + y // 2` is the dark square in row x, column y (see `xy_to_square`).
+    Moves are tuples of square indices, (from, to) or (from, to, to, ...) for jumps.
+
+    `Engine` doesn't search on it: in pure Python, its move generation and make/unmake are about
+    half the speed of `Board`'s table-driven `apply`/`undo` (perft(7) from the start takes ~1.1s
+    against ~0.55s), since each shift and mask is a big-integer operation of its own. It is used
+    where a position has to be small or whole-board tests matter: the tablebase, `encode_position`,
+    `batch_eval`, and the capture test in `Engine.evaluate_children`.
+    """
+
+    # constants (Bitboard._____)
+    FULL = 0xFFFFFFFF
+    EVEN_ROWS = 0x0F0F0F0F
+    ODD_ROWS = 0xF0F0F0F0
+    LEFT_COLUMN = 0x11111111   # k == 0, the dark square nearest column A
+    RIGHT_COLUMN = 0x88888888  # k == 3, the dark square nearest column H
+    CROWN_ROWS = {Checker.PLAYER_ONE: 0xF0000000, Checker.PLAYER_TWO: 0x0000000F}
+
+    # constructor
+    def __init__(self, one = 0, two = 0, kings = 0):
+        """Constructs a bitboard from player one's, player two's and the kings' masks."""
+        self.one = one
+        self.two = two
+        self.kings = kings
+
+    @staticmethod
+    def from_board(board):
+        """Converts a `Board` to a bitboard."""
+        one = two = kings = 0
+        for square in range(32):
+            x, y = square_to_xy(square)
+            piece = board.data[x][y]
+            if piece is None: continue
+            if piece.player == Checker.PLAYER_ONE: one |= 1 << square
+            else: two |= 1 << square
+            if piece.king: kings |= 1 << square
+        return Bitboard(one, two, kings)
+
+    def to_board(self):
+        """Converts this bitboard back to a `Board`."""
+        board = Board(True)
+        board.data = Board.empty_rows(8)
+        for square in range(32):
+            bit = 1 << square
+            if (self.one | self.two) & bit:
+                x, y = square_to_xy(square)
+                player = Checker.PLAYER_ONE if self.one & bit else Checker.PLAYER_TWO
+                board.data[x][y] = Checker(player, bool(self.kings & bit))
+        board.rehash()
+        return board
+
+    def copy(self):
+        return Bitboard(self.one, self.two, self.kings)
+
+    def __eq__(self, other):
+        return isinstance(other, Bitboard) and (self.one, self.two, self.kings) == (other.one, other.two, other.kings)
+
+    def __hash__(self):
+        return hash((self.one, self.two, self.kings))
+
+    # one-step diagonal shifts of a whole mask (up is towards row 7)
+    @staticmethod
+    def up_left(mask):
+        return (((mask & Bitboard.EVEN_ROWS) << 4) | ((mask & Bitboard.ODD_ROWS & ~Bitboard.LEFT_COLUMN) << 3)) & Bitboard.FULL
+
+    @staticmethod
+    def up_right(mask):
+        return (((mask & Bitboard.EVEN_ROWS & ~Bitboard.RIGHT_COLUMN) << 5) | ((mask & Bitboard.ODD_ROWS) << 4)) & Bitboard.FULL
+
+    @staticmethod
+    def down_left(mask):
+        return ((mask & Bitboard.EVEN_ROWS) >> 4) | ((mask & Bitboard.ODD_ROWS & ~Bitboard.LEFT_COLUMN) >> 5)
+
+    @staticmethod
+    def down_right(mask):
+        return ((mask & Bitboard.EVEN_ROWS & ~Bitboard.RIGHT_COLUMN) >> 3) | ((mask & Bitboard.ODD_ROWS) >> 4)
+
+    @staticmethod
+    def directions(player, king):
+        """The shift functions a piece may move along."""
+        if king: return Bitboard.SHIFTS
+        return Bitboard.SHIFTS[:2] if player == Checker.PLAYER_ONE else Bitboard.SHIFTS[2:]
+
+    def pieces(self, player):
+        return self.one if player == Checker.PLAYER_ONE else self.two
+
+    def empty(self):
+        return ~(self.one | self.two) & Bitboard.FULL
+
+    def has_captures(self, player):
+        """Can `player` jump anything? Computed for all pieces at once."""
+        own = self.pieces(player)
+        opponent = self.two if player == Checker.PLAYER_ONE else self.one
+        empty = self.empty()
+        men, kings = own & ~self.kings, own & self.kings
+        for shift in Bitboard.SHIFTS:
+            movers = kings | men if shift in Bitboard.directions(player, False) else kings
+            if movers and shift(shift(movers) & opponent) & empty: return True
+        return False
+
+    def moves(self, player):
+        """Returns all legal moves for `player` (only jumps if any jump is possible)."""
+        jumps = self.jumps(player)
+        if jumps: return jumps
+
+        moves = []
+        own = self.pieces(player)
+        empty = self.empty()
+        for kind in (own & ~self.kings, own & self.kings):
+            while kind:
+                bit = kind & -kind
+                kind ^= bit
+                square = bit.bit_length() - 1
+                for shift in Bitboard.directions(player, bit & self.kings):
+                    to = shift(bit) & empty
+                    if to: moves.append((square, to.bit_length() - 1))
+        return moves
+
+    def jumps(self, player):
+        """Returns every complete jump sequence for `player`."""
+        if not self.has_captures(player): return []
+        jumps = []
+        own = self.pieces(player)
+        opponent = self.two if player == Checker.PLAYER_ONE else self.one
+        while own:
+            bit = own & -own
+            own ^= bit
+            self._jump_paths(player, bit, bool(bit & self.kings), opponent, self.empty() | bit, [bit.bit_length() - 1], jumps)
+        return jumps
+
+    def _jump_paths(self, player, bit, king, opponent, empty, path, jumps):
+        """Depth-first walk over the jumps from `bit`; captured pieces come off `opponent` as we go."""
+        for shift in Bitboard.directions(player, king):
+            over = shift(bit) & opponent
+            if not over: continue
+            to = shift(over) & empty
+            if not to: continue
+            path.append(to.bit_length() - 1)
+            crowned = king or bool(to & Bitboard.CROWN_ROWS[player])
+            length = len(jumps)
+            self._jump_paths(player, to, crowned, opponent & ~over, (empty | over | bit) & ~to, path, jumps)
+            if len(jumps) == length: jumps.append(tuple(path))
+            path.pop()
+
+    def make(self, player, move):
+        """Plays `move` for `player` in place. Returns the masks needed by `unmake`."""
+        undo = self.one, self.two, self.kings
+        frm, to = 1 << move[0], 1 << move[-1]
+        king = self.kings & frm
+        captured = 0
+        for a, b in zip(move, move[1:]):
+            if abs((a >> 2) - (b >> 2)) == 2: captured |= 1 << JUMPED[a, b]
+            if (1 << b) & Bitboard.CROWN_ROWS[player]: king = True
+        if player == Checker.PLAYER_ONE:
+            self.one = (self.one & ~frm) | to
+            self.two &= ~captured
         else:
-            print(message[1])
-            break
+            self.two = (self.two & ~frm) | to
+            self.one &= ~captured
+        self.kings &= ~(frm | captured)
+        if king: self.kings |= to
+        return undo
+
+    def unmake(self, undo):
+        """Takes back a move, given what `make` returned."""
+        self.one, self.two, self.kings = undo
+
+Bitboard.SHIFTS = (Bitboard.up_left, Bitboard.up_right, Bitboard.down_left, Bitboard.down_right)
+
+# binary positions: the (one, two, kings) masks, then the side to move (0 for player one, 1 for player two)
+POSITION = struct.Struct('<IIIB')
+FEN_SIDES = {Checker.PLAYER_ONE: 'O', Checker.PLAYER_TWO: 'X'}
+
+def encode_position(board, player):
+    """Encodes `board` with `player` to move as POSITION.size (13) bytes."""
+    bitboard = Bitboard.from_board(board)
+    return POSITION.pack(bitboard.one, bitboard.two, bitboard.kings, player == Checker.PLAYER_TWO)
+
+def decode_position(data, offset = 0):
+    """Decodes a position made by `encode_position` (at `offset` in `data`). Returns (board, player)."""
+    one, two, kings, side = POSITION.unpack_from(data, offset)
+    return Bitboard(one, two, kings).to_board(), Checker.PLAYER_TWO if side else Checker.PLAYER_ONE
+
+def to_fen(board, player):
+    """
+    Writes `board` with `player` to move as text in the manner of PDN's FEN tags: the side to move,
+    then each side's squares (numbered 1 to 32, as square index + 1, with K before kings), e.g.
+    the start is O:O1,2,3,4,5,6,7,8,9,10,11,12:X21,22,23,24,25,26,27,28,29,30,31,32
+    """
+    bitboard = Bitboard.from_board(board)
+    fields = [FEN_SIDES[player]]
+    for side, mask in [(Checker.PLAYER_ONE, bitboard.one), (Checker.PLAYER_TWO, bitboard.two)]:
+        squares = [('K' if bitboard.kings >> square & 1 else '') + str(square + 1) for square in range(32) if mask >> square & 1]
+        fields.append(FEN_SIDES[side] + ','.join(squares))
+    return ':'.join(fields)
+
+def from_fen(text):
+    """Reads a position written by `to_fen`. Returns (board, player); raises ValueError if it can't."""
+    sides = {char: side for side, char in FEN_SIDES.items()}
+    fields = text.strip().split(':')
+    if len(fields) != 3 or fields[0] not in sides: raise ValueError('not a position: %r' % text)
+    masks = {}
+    for field in fields[1:]:
+        if field[:1] not in sides or field[0] in masks: raise ValueError('not a position: %r' % text)
+        masks[field[0]] = 0
+        for square in field[1:].split(',') if len(field) > 1 else []:
+            king = square.startswith('K')
+            number = int(square[1:] if king else square) - 1
+            if not 0 <= number < 32: raise ValueError('no square %s in %r' % (square, text))
+            masks[field[0]] |= 1 << number
+            masks['K'] = masks.get('K', 0) | king << number
+    if masks['O'] & masks['X']: raise ValueError('two pieces on one square in %r' % text)
+    return Bitboard(masks['O'], masks['X'], masks.get('K', 0)).to_board(), sides[fields[0]]
+
+class DiffRenderer:
+    """
+    Draws boards on an ANSI terminal for watching a game go by: the first board in full, and after that
+    only the squares that changed, as cursor moves and glyphs. Boards are drawn from terminal line `top`.
+    """
+
+    # constructor
+    def __init__(self, top = 1):
+        self.top = top
+        self.player = None
+        self.glyphs = None
+
+    def render(self, board, player):
+        """Returns what to write to the terminal to bring it from the last board drawn to `board`, as seen by `player`."""
+        places = RENDER_TEMPLATES[player][2]
+        glyphs = [Checker.character(board.data[x][y]) for x, y in SQUARES]
+        if player != self.player or self.glyphs is None:
+            self.player, self.glyphs = player, glyphs
+            return '\x1b[%i;1H\x1b[J%s\n' % (self.top, board.render(player))
+        changes = []
+        for square, glyph in enumerate(glyphs):
+            if glyph != self.glyphs[square]:
+                line, column = places[square]
+                changes.append('\x1b[%i;%iH%s' % (self.top + line, column + 1, glyph))
+        self.glyphs = glyphs
+        # leave the cursor under the board
+        if changes: changes.append('\x1b[%i;1H' % (self.top + 18))
+        return ''.join(changes)
 
+def comp_move(board, player, move):
+    """Plays a move chosen by the computer (a tuple of square indices) on `board`."""
+    board.apply(player, move)
     return board
 
 def is_coord(coord):
@@ -164,11 +651,11 @@ def ask_for_move(player):
         move = input('Player %s, enter move (ex. A0 B1 to move piece at A0 to B1): ' % player).split(' ')
     return move
 
-def input_and_move(player, board):
-    """Ask the player for a move, and move there, given a board."""
+def input_and_move(player, board, cache = None):
+    """Ask the player for a move, and move there, given a board (and a `MoveCache`, if there is one)."""
     move = ask_for_move(player)
 
-    check_move = get_valid_moves(board, player)
+    check_move = get_valid_moves(board, player, cache)
     while is_capture(board, player, check_move[0][0], check_move[0][1]) and not is_capture(board, player, move[0], move[1]):
         print('Invalid move: you must jump')
         move = ask_for_move(player)
@@ -192,34 +679,17 @@ def input_and_move(player, board):
     return board
 
 def eval_game_state(board):
-    has_player1 = False
-    has_player2 = False
-    totalscore = 0
-    for x in range(8):
-        for y in range(8):
-            piece = board.data[x][y]
-            if piece is not None:
-                # score the square
-                if piece.player == Checker.PLAYER_ONE:
-                    has_player1 = True
-                    if piece.king:
-                        totalscore -= 5
-                    else:
-                        totalscore -= max(abs(x - 3.5), abs(y - 3.5)) + .5
-                else:
-                    has_player2 = True
-                    if piece.king:
-                        totalscore += 5
-                    else:
-                        totalscore += max(abs(x - 3.5), abs(y - 3.5)) + .5
-
-    # we're assuming player 1 is human and player 2 is AI.
-    if not has_player1:
-        return 1337 # large value so that victory/defeat outweighs anything
-    if not has_player2:
-        return -1337
-
-    return totalscore
+    """
+    Scores the board for player 2: WIN if player 1 has no pieces left, -WIN if player 2 hasn't,
+    otherwise the running `score` the board keeps by its `Evaluator`'s weights.
+    """
+    # scores are always from player 2's side, whoever is playing; `Engine.evaluate` turns them round for player 1
+    if board.counts[Checker.PLAYER_ONE] == 0:
+        return WIN
+    if board.counts[Checker.PLAYER_TWO] == 0:
+        return -WIN
+
+    return board.score
 
 def is_capture(board, player, from_coords, to_coords):
     from_y, from_x = 'ABCDEFGH'.index(from_coords[0]), int(from_coords[1])
@@ -234,251 +704,715 @@ def is_capture(board, player, from_coords, to_coords):
         else:
             return True
 
-def get_no_capture_moves(board, player):
+def is_jump(move):
+    """Is this move (tuple of square indices) a jump? Only meant for legal moves."""
+    return abs((move[0] >> 2) - (move[1] >> 2)) == 2
+
+def get_square_jumps(board, player):
+    """
+    Returns every complete jump sequence `player` can make, as tuples of square indices.
+    A man crowned partway carries on jumping as a king.
+    """
+    data = board.data
+    jumps = []
+    for square, (x, y) in enumerate(SQUARES):
+        piece = data[x][y]
+        if piece is not None and piece.player == player:
+            # lift the piece, so that a jump can come back through where it started
+            data[x][y] = None
+            walk_jumps(data, player, piece.king, square, [square], jumps)
+            data[x][y] = piece
+    return jumps
+
+def walk_jumps(data, player, king, square, path, jumps):
+    """Depth-first walk over the jumps from `square`, taking captured pieces off the board and putting them back as it goes."""
+    for over_x, over_y, to, to_x, to_y in JUMP_TABLE[player, king][square]:
+        jumped_piece = data[over_x][over_y]
+        if jumped_piece is not None and jumped_piece.player != player and data[to_x][to_y] is None:
+            data[over_x][over_y] = None
+            path.append(to)
+            length = len(jumps)
+            walk_jumps(data, player, king or to < 4 or to > 27, to, path, jumps)
+            if len(jumps) == length: jumps.append(tuple(path))
+            path.pop()
+            data[over_x][over_y] = jumped_piece
+
+def has_jumps(board, player):
+    """Can `player` jump? Stops looking at the first jump found."""
+    data = board.data
+    for square, (x, y) in enumerate(SQUARES):
+        piece = data[x][y]
+        if piece is not None and piece.player == player:
+            for over_x, over_y, to, to_x, to_y in JUMP_TABLE[player, piece.king][square]:
+                jumped_piece = data[over_x][over_y]
+                if jumped_piece is not None and jumped_piece.player != player and data[to_x][to_y] is None:
+                    return True
+    return False
+
+def get_square_steps(board, player):
+    """Returns the non-capturing moves `player` can make, as (from, to) square indices."""
+    data = board.data
     moves = []
+    for square, (x, y) in enumerate(SQUARES):
+        piece = data[x][y]
+        if piece is not None and piece.player == player:
+            for to, to_x, to_y in MOVE_TABLE[player, piece.king][square]:
+                if data[to_x][to_y] is None:
+                    moves.append((square, to))
+    return moves
+
+def get_square_moves(board, player):
+    """Like `get_valid_moves`, but moves are tuples of square indices."""
+    # force jumping
+    return get_square_jumps(board, player) or get_square_steps(board, player)
 
-    for x in range(8):
-        for y in range(8):
-            if board.data[x][y] is not None and board.data[x][y].player == player:
+def get_no_capture_moves(board, player):
+    return [move_to_coords(m) for m in get_square_steps(board, player)]
 
-                # moves
-                # standard pieces
-                if not board.data[x][y].king:
-                    direction = 1 if player == Checker.PLAYER_ONE else -1
-                    can_move_forwards = x < 7 if player == Checker.PLAYER_ONE else x > 0
+def get_valid_moves(board, player, cache = None):
+    """The moves `player` can make, as lists of A0-style coordinates; looked up in `cache` (a `MoveCache`) if given."""
+    moves = cache.moves(board, player) if cache is not None else get_square_moves(board, player)
+    return [move_to_coords(m) for m in moves]
 
-                    # moves
-                    if can_move_forwards and y > 0 and board.data[x + direction][y - 1] is None:
-                        moves.append([xy_to_coords(x, y), xy_to_coords(x + direction, y - 1)])
-                    if can_move_forwards and y < 7 and board.data[x + direction][y + 1] is None:
-                        moves.append([xy_to_coords(x, y), xy_to_coords(x + direction, y + 1)])
+class MoveCache:
+    """
+    A bounded least-recently-used cache of `get_square_moves`, keyed by `position_key`,
+    counting its hits and misses.
+    """
 
-                # kings
-                else:
+    # constructor
+    def __init__(self, size = 1 << 16):
+        """Constructs a cache that holds the moves of up to `size` positions."""
+        self.size = size
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def moves(self, board, player):
+        """Returns the moves `player` can make on `board`, as a new list each time (so callers may sort it)."""
+        key = position_key(board, player)
+        moves = self.entries.get(key)
+        if moves is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return list(moves)
+        self.misses += 1
+        moves = get_square_moves(board, player)
+        self.entries[key] = tuple(moves)
+        if len(self.entries) > self.size: self.entries.popitem(last = False)
+        return moves
+
+    def moves_for(self, positions):
+        """Returns the moves for each of a list of (board, player) positions."""
+        return [self.moves(board, player) for board, player in positions]
+
+    def stats(self):
+        """Returns the hits, misses, hit rate and number of positions held, as a dict."""
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / lookups if lookups > 0 else 0.0,
+                'positions': len(self.entries)}
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+def xy_to_coords(x, y):
+    return 'ABCDEFGH'[y] + str(x)
+
+class TranspositionTable:
+    """
+    A fixed-size table of search results, indexed by Zobrist key (see `position_key`).
+    Keep one per game so that results carry over from move to move.
+    """
 
-                    # moves
-                    if y > 0 and x > 0 and board.data[x - 1][y - 1] is None:
-                        moves.append([xy_to_coords(x, y), xy_to_coords(x - 1, y - 1)])
-                    if y < 7 and x < 7 and board.data[x + 1][y + 1] is None:
-                        moves.append([xy_to_coords(x, y), xy_to_coords(x + 1, y + 1)])
-                    if y > 0 and x < 7 and board.data[x + 1][y - 1] is None:
-                        moves.append([xy_to_coords(x, y), xy_to_coords(x + 1, y - 1)])
-                    if y < 7 and x > 0 and board.data[x - 1][y + 1] is None:
-                        moves.append([xy_to_coords(x, y), xy_to_coords(x - 1, y + 1)])
+    # constants (TranspositionTable._____)
+    EXACT = 0
+    LOWER = 1  # the score is at least this much (the search was cut off)
+    UPPER = 2  # the score is at most this much
 
+    # constructor
+    def __init__(self, size = 1 << 18):
+        """Constructs an empty table with room for `size` entries."""
+        self.size = size
+        self.entries = [None] * size
+        self.generation = 0
+
+    def new_search(self):
+        """Call before each search, so entries left over from earlier moves get replaced first."""
+        self.generation += 1
+
+    def probe(self, key):
+        """Returns the entry (key, depth, score, flag, move, generation) for a position, or None."""
+        entry = self.entries[key % self.size]
+        return entry if entry is not None and entry[0] == key else None
+
+    def store(self, key, depth, score, flag, move):
+        """
+        Stores a search result. A slot holding a different position is only taken over
+        if that entry is from an earlier search or was searched no deeper than this one.
+        """
+        index = key % self.size
+        entry = self.entries[index]
+        if entry is None or entry[0] == key or entry[5] != self.generation or entry[1] <= depth:
+            self.entries[index] = (key, depth, score, flag, move, self.generation)
+
+    def clear(self):
+        self.entries = [None] * self.size
+
+def order_hash_move(moves, entry):
+    """Moves the best move stored in a table entry (if any) to the front of `moves`."""
+    if entry is not None and entry[4] is not None:
+        for i, m in enumerate(moves):
+            if m == entry[4]:
+                moves.insert(0, moves.pop(i))
+                break
     return moves
 
-def get_valid_moves(board, player):
-    moves = []
+class MoveOrdering:
+    """
+    Sorts the moves at each node so that the ones likeliest to cause a cutoff are searched first:
+    the transposition table's best move, then captures and promotions by how much they gain,
+    then the two killer moves for the ply (quiet moves that caused cutoffs at the same ply elsewhere),
+    then quiet moves by their history score (how often and how deep they caused cutoffs).
+    Each heuristic can be switched off, to compare orderings.
+    """
 
-    for x in range(8):
-        for y in range(8):
-            if board.data[x][y] is not None and board.data[x][y].player == player:
-                capture = 2 if player == Checker.PLAYER_ONE else -2
-
-                # captures
-                # standard pieces
-                if not board.data[x][y].king:
-                    # use nested ifs for readability
-                    can_move_forwards = x < 6 if player == Checker.PLAYER_ONE else x > 1
-                    if can_move_forwards and y > 1 and board.data[x + capture][y - 2] is None:
-                        if is_capture(board, player, xy_to_coords(x, y), xy_to_coords(x + capture, y - 2)):
-                            moves.append([xy_to_coords(x, y), xy_to_coords(x + capture, y - 2)])
-                    if can_move_forwards and y < 6 and board.data[x + capture][y + 2] is None:
-                        if is_capture(board, player, xy_to_coords(x, y), xy_to_coords(x + capture, y + 2)):
-                            moves.append([xy_to_coords(x, y), xy_to_coords(x + capture, y + 2)])
-
-                # kings
-                else:
-                    if y > 1 and x > 1 and board.data[x - 2][y - 2] is None:
-                        if is_capture(board, player, xy_to_coords(x, y), xy_to_coords(x - 2, y - 2)):
-                            moves.append([xy_to_coords(x, y), xy_to_coords(x - 2, y - 2)])
-                    if y < 6 and x < 6 and board.data[x + 2][y + 2] is None:
-                        if is_capture(board, player, xy_to_coords(x, y), xy_to_coords(x + 2, y + 2)):
-                            moves.append([xy_to_coords(x, y), xy_to_coords(x + 2, y + 2)])
-                    if y > 1 and x < 6 and board.data[x + 2][y - 2] is None:
-                        if is_capture(board, player, xy_to_coords(x, y), xy_to_coords(x + 2, y - 2)):
-                            moves.append([xy_to_coords(x, y), xy_to_coords(x + 2, y - 2)])
-                    if y < 6 and x > 1 and board.data[x - 2][y + 2] is None:
-                        if is_capture(board, player, xy_to_coords(x, y), xy_to_coords(x - 2, y + 2)):
-                            moves.append([xy_to_coords(x, y), xy_to_coords(x - 2, y + 2)])
+    # constructor
+    def __init__(self, hash_move = True, captures = True, killers = True, history = True):
+        self.hash_move = hash_move
+        self.captures = captures
+        self.killers = killers
+        self.history = history
+        self.killer_moves = [[None, None] for _ in range(MAX_PLY + 2)]
+        self.history_scores = {Checker.PLAYER_ONE: {}, Checker.PLAYER_TWO: {}}
+
+    def new_search(self):
+        """Forgets the killer moves, which are tied to plies of the last search, and ages the history."""
+        self.killer_moves = [[None, None] for _ in range(MAX_PLY + 2)]
+        for scores in self.history_scores.values():
+            for move in scores:
+                scores[move] //= 2
+
+    def gain(self, board, player, move):
+        """How much a capture or promotion gains for `player` by `eval_game_state`'s weights; 0 for other moves."""
+        x, y = SQUARES[move[0]]
+        piece = board.data[x][y]
+        crowned = piece.king or any(b < 4 or b > 27 for b in move[1:])
+        if crowned == piece.king and not is_jump(move): return 0
+        weights = board.weights
+        gain = weights[player, crowned][move[-1]] - weights[player, piece.king][move[0]]
+        if is_jump(move):
+            for a, b in zip(move, move[1:]):
+                x, y = SQUARES[JUMPED[a, b]]
+                captured = board.data[x][y]
+                gain -= weights[captured.player, captured.king][JUMPED[a, b]]
+        return gain if player == Checker.PLAYER_TWO else -gain
+
+    def order(self, moves, entry, board, player, ply):
+        """Sorts `moves` (in place, and returns them); `entry` is the position's transposition table entry, or None."""
+        # sorts are stable, so ties keep generation order
+        if len(moves) < 2: pass
+        elif is_jump(moves[0]): # then every move is a capture
+            if self.captures: moves.sort(key = lambda move: -self.gain(board, player, move))
+        elif self.captures or self.killers or self.history:
+            killers = self.killer_moves[ply] if self.killers else ()
+            history = self.history_scores[player] if self.history else {}
+            def priority(move):
+                gain = self.gain(board, player, move) if self.captures and (move[1] < 4 or move[1] > 27) else 0
+                killer = 2 - killers.index(move) if move in killers else 0
+                return -gain, -killer, -history.get(move, 0)
+            moves.sort(key = priority)
+        if self.hash_move: order_hash_move(moves, entry)
+        return moves
+
+    def cutoff(self, board, player, move, depth, ply):
+        """Remembers a move that caused a beta cutoff. Captures and promotions are ordered by gain already."""
+        if is_jump(move) or self.gain(board, player, move) != 0: return
+        killers = self.killer_moves[ply]
+        if killers[0] != move:
+            killers[1], killers[0] = killers[0], move
+        scores = self.history_scores[player]
+        scores[move] = scores.get(move, 0) + depth * depth
+
+# move orderings by name, for comparing them (see `bench`)
+ORDERINGS = {
+    'full': {},
+    'hash': {'captures': False, 'killers': False, 'history': False},
+    'none': {'hash_move': False, 'captures': False, 'killers': False, 'history': False},
+}
+
+def opponent(player):
+    """The other player."""
+    return Checker.PLAYER_TWO if player == Checker.PLAYER_ONE else Checker.PLAYER_ONE
+
+def score_to_table(score, ply):
+    """Win/loss scores count plies from the root; the table stores them counted from the position itself."""
+    if score > WIN - MAX_PLY: return score + ply
+    if score < MAX_PLY - WIN: return score - ply
+    return score
+
+def score_from_table(score, ply):
+    """The inverse of `score_to_table`."""
+    if score > WIN - MAX_PLY: return score - ply
+    if score < MAX_PLY - WIN: return score + ply
+    return score
+
+class SearchTimeout(Exception):
+    """Raised inside the search when its time budget has run out."""
+
+SearchResult = collections.namedtuple('SearchResult', ['move', 'score', 'depth', 'pv', 'nodes', 'stats'], defaults = [None])
+
+class SearchStats:
+    """
+    What a search did: nodes visited, leaves evaluated, beta cutoffs (and how many of those the first
+    move tried caused), transposition table probes and hits, the deepest ply evaluated, and the seconds
+    spent generating moves, evaluating leaves and making and taking back moves.
+    Filled in by an `Engine` made with `trace = True`.
+    """
 
-    # force jumping
-    if len(moves) > 0: return moves
-    else: moves = get_no_capture_moves(board, player)
+    # constructor
+    def __init__(self):
+        self.nodes = 0
+        self.evaluations = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.probes = 0
+        self.hits = 0
+        self.max_ply = 0
+        self.movegen_seconds = 0.0
+        self.eval_seconds = 0.0
+        self.apply_seconds = 0.0
+        self.seconds = 0.0
+
+    def cutoff(self, i):
+        """Counts a beta cutoff by the `i`th move tried."""
+        self.cutoffs += 1
+        if i == 0: self.first_move_cutoffs += 1
+
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs > 0 else 0.0
+
+    def as_dict(self):
+        stats = dict(vars(self))
+        stats['first_move_cutoff_rate'] = self.first_move_cutoff_rate()
+        return stats
+
+def timed(function, stats, field):
+    """Wraps `function` so that the seconds it takes are added to the `field` attribute of `stats`."""
+    def wrapper(*args):
+        start = time.perf_counter()
+        result = function(*args)
+        setattr(stats, field, getattr(stats, field) + time.perf_counter() - start)
+        return result
+    return wrapper
+
+class Engine:
+    """
+    The computer player: negamax alpha-beta search with iterative deepening.
+    Scores are from the point of view of the player to move. An engine keeps its
+    transposition table between searches, so use one engine for a whole game.
+    """
 
-    return moves
+    # constructor
+    def __init__(self, table = None, tablebase = None, book = None, batch = False, trace = False, ordering = None,
+                 quiescence = DEFAULT_QUIESCENCE, cache = None, evaluator = None):
+        """
+        Constructs an engine, with a new `TranspositionTable` unless one is given.
+        With a `tablebase.Tablebase`, positions with few enough pieces are looked up instead of searched,
+        and with a `book.OpeningBook`, so are the positions it holds.
+        With `batch`, the leaves below each node one ply from the horizon are scored together by `batch_eval`.
+        With `trace`, every search returns `SearchStats` too; without it, nothing is counted or timed.
+        Moves are sorted by `ordering`, a `MoveOrdering` (with every heuristic, unless one is given).
+        At the horizon, captures (which are forced) are searched on until the position is quiet,
+        but no more than `quiescence` plies further; 0 evaluates at the horizon whatever is going on.
+        Moves are generated through `cache`, a `MoveCache` (a new one, kept between searches, unless one is given).
+        Positions are scored by `evaluator`, an `Evaluator` (the default weights, unless one is given).
+        """
+        self.table = table if table is not None else TranspositionTable()
+        self.ordering = ordering if ordering is not None else MoveOrdering()
+        self.quiescence = quiescence
+        self.tablebase = tablebase
+        self.book = book
+        self.trace = trace
+        self.stats = None
+        self.cache = cache if cache is not None else MoveCache()
+        self.generate = self.cache.moves
+        self.evaluator = evaluator if evaluator is not None else DEFAULT_EVALUATOR
+        self.batch_eval = None
+        if batch:
+            import batch_eval # needs NumPy, so only imported when asked for
+            self.batch_eval = batch_eval
+        self.nodes = 0
+        self.deadline = None
+        self.pv_table = [[]] * (MAX_PLY + 2)
+
+    def search(self, board, player, depth = None, time_budget = None):
+        """
+        Finds the best move for `player` on `board`, searching 1, 2, 3... plies deep until `depth` plies
+        or, if `time_budget` (in seconds) is given, until the time is up; the deepest finished iteration counts.
+        Without either, searches DEFAULT_DEPTH plies. The board is left as it was found.
+        Returns a SearchResult(move, score, depth, pv, nodes, stats); `move` is None if `player` can't move,
+        and `stats` is None unless the engine traces its searches.
+        """
+        if self.book is not None:
+            result = book_move(self.book, board, player)
+            if result is not None: return result
+        if board.weights is not self.evaluator.table:
+            # score by this engine's weights for the length of the search
+            weights = board.weights
+            board.set_weights(self.evaluator.table)
+            try:
+                return self.search(board, player, depth, time_budget)
+            finally:
+                board.set_weights(weights)
+        if not self.trace: return self.deepen(board, player, depth, time_budget)
+
+        # swap timed and counting wrappers in for the length of the search
+        self.stats = stats = SearchStats()
+        start = time.perf_counter()
+        generate, evaluate, evaluate_children, probe = self.generate, self.evaluate, self.evaluate_children, self.table.probe
+        def traced_evaluate(board, player, ply):
+            stats.evaluations += 1
+            stats.max_ply = max(stats.max_ply, ply)
+            return evaluate(board, player, ply)
+        def traced_evaluate_children(board, player, moves, ply):
+            stats.evaluations += len(moves)
+            stats.max_ply = max(stats.max_ply, ply)
+            return evaluate_children(board, player, moves, ply)
+        def traced_probe(key):
+            entry = probe(key)
+            stats.probes += 1
+            if entry is not None: stats.hits += 1
+            return entry
+        self.generate = timed(generate, stats, 'movegen_seconds')
+        self.evaluate = timed(traced_evaluate, stats, 'eval_seconds')
+        self.evaluate_children = timed(traced_evaluate_children, stats, 'eval_seconds')
+        self.table.probe = traced_probe
+        board.apply = timed(board.apply, stats, 'apply_seconds')
+        board.undo = timed(board.undo, stats, 'apply_seconds')
+        try:
+            result = self.deepen(board, player, depth, time_budget)
+        finally:
+            self.generate = generate
+            del self.evaluate, self.evaluate_children, self.table.probe, board.apply, board.undo
+            self.stats = None
+        stats.nodes = result.nodes
+        stats.seconds = time.perf_counter() - start
+        return result._replace(stats = stats)
+
+    def deepen(self, board, player, depth, time_budget):
+        """The iterative deepening loop of `search`."""
+        if depth is None: depth = DEFAULT_DEPTH if time_budget is None else MAX_DEPTH
+        start = time.time()
+        self.table.new_search()
+        self.ordering.new_search()
+        self.nodes = 0
+        self.deadline = None
+
+        moves = self.cache.moves(board, player)
+        if len(moves) == 0: return SearchResult(None, MAX_PLY - WIN, 0, [], 0)
+        order = {m: i for i, m in enumerate(moves)}
+
+        result = None
+        for iteration in range(1, depth + 1):
+            # the first iteration always finishes, so there is always a move to play
+            if time_budget is not None and iteration > 1: self.deadline = start + time_budget
+            try:
+                score, move, pv = self.search_root(board, player, iteration, moves, order)
+            except SearchTimeout:
+                break
+            result = SearchResult(move, score, iteration, pv, self.nodes)
 
-def xy_to_coords(x, y):
-    return 'ABCDEFGH'[y] + str(x)
+            # search the best move from this iteration first in the next one
+            moves.remove(move)
+            moves.insert(0, move)
+            # a win or loss that plays out within the search can't change by searching deeper
+            if len(moves) == 1 or WIN - abs(score) <= iteration: break
+            if time_budget is not None and time.time() - start >= time_budget: break
 
-def get_best_move(board, recurse_depth = 0, moves_so_far = [], maximum = 1337):
-    # first we need to get a list of valid moves.
-    moves = get_valid_moves(board, Checker.PLAYER_TWO)
-    copy_moves_so_far = moves_so_far[:]
-    # now we should loop through them, and use recursion to keep getting moves.
-    boards = []
-    #print('a',moves) #debug
-    minimum = -1337
-    for m in moves:
-        AI_moved_board = board.deepcopy()
-        if is_capture(AI_moved_board, Checker.PLAYER_TWO, m[0], m[1]):
-            AI_moved_board = AI_moved_board.move(Checker.PLAYER_TWO, m[0], m[1])[1]
-            jump = get_best_jump(AI_moved_board, Checker.PLAYER_TWO, m[1])
-            
-            AI_moved_board = jump[1]
-            if jump[0] != []:
-                for i in jump[0]:
-                    m.append(i)
-        else:
-            opponent_moved_board = AI_moved_board.move(Checker.PLAYER_TWO, m[0], m[1])[1]
-        # we've done a full move.
-        # now call `get_o_best_move` on the new board.
-        if recurse_depth >= 5: # make this bigger for more look-ahead
-            state_score = eval_game_state(AI_moved_board)
-            if state_score >= maximum: return [AI_moved_board, state_score] + moves_so_far
-            boards.append([AI_moved_board, state_score])
-        else:
-            copy_moves_so_far = moves_so_far[:]
-            copy_moves_so_far.append(m)
-            next_move = get_o_best_move(AI_moved_board, recurse_depth + 1, copy_moves_so_far, minimum)
-            if next_move[1] >= maximum: return next_move + moves_so_far
-            if next_move[1] >= minimum:
-                minimum = next_move[1]
-                boards.append(next_move)
-    if boards == []:
-        return [0,-1337] + moves_so_far
-    best_board = boards[0]
-    for b in boards:
-        if b[1] > best_board[1]: best_board = b
-    return best_board + moves_so_far
-
-def get_o_best_move(board, recurse_depth = 0, moves_so_far = [], minimum = -1337):
-    # first we need to get a list of valid moves.
-    moves = get_valid_moves(board, Checker.PLAYER_ONE)
-    copy_moves_so_far = moves_so_far[:]
-    # now we should loop through them, and use recursion to keep getting moves.
-    boards = []
-    maximum = 1337
-    for m in moves:
-        opponent_moved_board = board.deepcopy()
-        if is_capture(opponent_moved_board, Checker.PLAYER_ONE, m[0], m[1]):
-            opponent_moved_board = opponent_moved_board.move(Checker.PLAYER_ONE, m[0], m[1])[1]
-            jump = get_best_jump(opponent_moved_board, Checker.PLAYER_TWO, m[1])
-            
-            opponent_moved_board = jump[1]
-            if jump[0] != []:
-                for i in jump[0]:
-                    m.append(i)
-        else:
-            opponent_moved_board = opponent_moved_board.move(Checker.PLAYER_ONE, m[0], m[1])[1]
-        
-        # we've done a full move.
-        # now call `get_best_move` on the new board.
-        if recurse_depth >= 5: # make this bigger for more look-ahead
-            state_score = eval_game_state(opponent_moved_board)
-            if state_score <= minimum: return [opponent_moved_board, state_score] + moves_so_far
-            boards.append([opponent_moved_board, state_score])
-                
+        self.deadline = None
+        return result._replace(nodes = self.nodes)
+
+    def search_root(self, board, player, depth, moves, order):
+        """
+        Searches every move at the root. Returns (score, best move, principal variation).
+        Of equally good moves, the one first in `order` (move -> index) is picked, however the
+        moves were sorted; this is what lets `parallel_search` come to the same answer.
+        """
+        best_score, best_move, pv = -INFINITY, None, []
+        for m in moves:
+            # open the window just below the best score so that a tie is scored exactly
+            alpha = best_score - ROOT_TIE_MARGIN
+            record = board.apply(player, m)
+            try:
+                score = -self.negamax(board, opponent(player), depth - 1, -INFINITY, -alpha, 1)
+            finally:
+                board.undo(record)
+            if score > best_score or (score == best_score and order[m] < order[best_move]):
+                best_score, best_move = score, m
+                pv = [m] + self.pv_table[1]
+        self.table.store(position_key(board, player), depth, score_to_table(best_score, 0), TranspositionTable.EXACT, best_move)
+        return best_score, best_move, pv
+
+    def negamax(self, board, player, depth, alpha, beta, ply):
+        """Returns the score for `player`, who is to move, searching `depth` plies with the window (alpha, beta)."""
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % 256 == 0 and time.time() > self.deadline:
+            raise SearchTimeout()
+        self.pv_table[ply] = []
+        if self.tablebase is not None and board.pieces <= self.tablebase.max_pieces:
+            found = self.tablebase.probe(board, player)
+            if found is not None:
+                result, plies = found
+                return result * (WIN - ply - plies)
+        # past the horizon, only play on through captures
+        if depth <= 0 and (depth <= -self.quiescence or not has_jumps(board, player)): return self.evaluate(board, player, ply)
+
+        key = position_key(board, player)
+        entry = self.table.probe(key)
+        if entry is not None and entry[1] == depth:
+            # only reuse scores searched exactly as deep, so results don't depend on what the table holds
+            score, flag = score_from_table(entry[2], ply), entry[3]
+            if flag == TranspositionTable.EXACT: return score
+            if flag == TranspositionTable.LOWER and score >= beta: return score
+            if flag == TranspositionTable.UPPER and score <= alpha: return score
+
+        moves = self.ordering.order(self.generate(board, player), entry, board, player, ply)
+        if len(moves) == 0: return ply - WIN # no moves left, so this player has lost
+        leaves = None
+        if depth == 1 and self.batch_eval is not None:
+            leaves = self.evaluate_children(board, player, moves, ply + 1)
+
+        original_alpha = alpha
+        best_score, best_move = -INFINITY, None
+        for i, m in enumerate(moves):
+            if leaves is not None and leaves[i] is not None:
+                self.nodes += 1
+                if self.deadline is not None and self.nodes % 256 == 0 and time.time() > self.deadline:
+                    raise SearchTimeout()
+                self.pv_table[ply + 1] = []
+                score = leaves[i]
+            else:
+                record = board.apply(player, m)
+                try:
+                    score = -self.negamax(board, opponent(player), depth - 1, -beta, -alpha, ply + 1)
+                finally:
+                    board.undo(record)
+            if score > best_score:
+                best_score, best_move = score, m
+                if score > alpha:
+                    alpha = score
+                    self.pv_table[ply] = [m] + self.pv_table[ply + 1]
+                    if alpha >= beta:
+                        if self.stats is not None: self.stats.cutoff(i)
+                        self.ordering.cutoff(board, player, m, depth, ply)
+                        break
+
+        if best_score <= original_alpha: flag = TranspositionTable.UPPER
+        elif best_score >= beta: flag = TranspositionTable.LOWER
+        else: flag = TranspositionTable.EXACT
+        self.table.store(key, depth, score_to_table(best_score, ply), flag, best_move)
+        return best_score
+
+    def evaluate_children(self, board, player, moves, ply):
+        """
+        Scores the positions `moves` lead to with one `batch_eval` call, as `evaluate` would at `ply`,
+        but from `player`'s point of view. Positions the tablebase holds, and those where the opponent
+        has a capture for quiescence search to play out, are left as None, to be searched.
+        """
+        bitboard = Bitboard.from_board(board)
+        positions, found = [], []
+        for i, m in enumerate(moves):
+            pieces = board.pieces - (len(m) - 1 if is_jump(m) else 0)
+            if self.tablebase is not None and pieces <= self.tablebase.max_pieces: continue
+            undo = bitboard.make(player, m)
+            if self.quiescence == 0 or not bitboard.has_captures(opponent(player)):
+                positions.append((bitboard.one, bitboard.two, bitboard.kings))
+                found.append(i)
+            bitboard.unmake(undo)
+        leaves = [None] * len(moves)
+        if len(positions) == 0: return leaves
+        for i, score in zip(found, self.batch_eval.evaluate_masks(positions, board.weights).tolist()):
+            if score >= WIN: score = WIN - ply
+            elif score <= -WIN: score = ply - WIN
+            leaves[i] = score if player == Checker.PLAYER_TWO else -score
+        return leaves
+
+    def evaluate(self, board, player, ply):
+        """`eval_game_state` from `player`'s point of view, with wins sooner scored higher."""
+        score = eval_game_state(board)
+        if score >= WIN: score = WIN - ply
+        elif score <= -WIN: score = ply - WIN
+        return score if player == Checker.PLAYER_TWO else -score
+
+def book_move(book, board, player):
+    """Looks a position up in an opening book. Returns a SearchResult, or None if the book has no legal move for it."""
+    found = book.choose(board, player)
+    if found is None or found[0] not in get_square_moves(board, player): return None
+    return SearchResult(found[0], found[1], 0, [found[0]], 0)
+
+def get_best_move(board, player = Checker.PLAYER_TWO, depth = None, time_budget = None, table = None, trace = False, ordering = None,
+                  quiescence = DEFAULT_QUIESCENCE, evaluator = None):
+    """Searches for `player`'s best move with a new `Engine`; see `Engine.search`."""
+    return Engine(table, trace = trace, ordering = ordering, quiescence = quiescence, evaluator = evaluator).search(board, player, depth, time_budget)
+
+def log_search(output, player, result, seconds):
+    """Writes a search's result, and its `SearchStats` if it has them, to `output` as a line of JSON."""
+    output.write(json.dumps({
+        'player': player,
+        'move': move_to_coords(result.move) if result.move is not None else None,
+        'score': result.score,
+        'depth': result.depth,
+        'pv': [move_to_coords(m) for m in result.pv],
+        'nodes': result.nodes,
+        'seconds': seconds,
+        'stats': result.stats.as_dict() if result.stats is not None else None,
+    }) + '\n')
+    output.flush()
+
+# each worker process keeps one engine (and so one transposition table) for all of its jobs
+worker_engine = None
+
+def search_root_move(position, move, depth, deadline, tablebase_path = None, quiescence = DEFAULT_QUIESCENCE, evaluator = None):
+    """
+    Runs in a worker process: scores one root move, given the position as `encode_position` bytes.
+    Returns (score, nodes, pv), or None if `deadline` passed first.
+    """
+    global worker_engine
+    if (worker_engine is None or getattr(worker_engine.tablebase, 'path', None) != tablebase_path or
+            worker_engine.quiescence != quiescence or worker_engine.evaluator != (evaluator or DEFAULT_EVALUATOR)):
+        from tablebase import Tablebase
+        worker_engine = Engine(tablebase = Tablebase(tablebase_path) if tablebase_path is not None else None, quiescence = quiescence,
+                               evaluator = evaluator)
+    engine = worker_engine
+    board, player = decode_position(position)
+    board.set_weights(engine.evaluator.table)
+    engine.table.new_search()
+    engine.nodes = 0
+    engine.deadline = deadline
+    board.apply(player, move)
+    try:
+        score = -engine.negamax(board, opponent(player), depth - 1, -INFINITY, INFINITY, 1)
+    except SearchTimeout:
+        return None
+    finally:
+        engine.deadline = None
+    return score, engine.nodes, engine.pv_table[1]
+
+def parallel_search(board, player, depth = None, time_budget = None, workers = None, executor = None, tablebase = None, book = None,
+                    quiescence = DEFAULT_QUIESCENCE, evaluator = None):
+    """
+    Like `Engine.search`, but the root moves are shared out over a pool of processes.
+    Each root move is scored exactly, so at a fixed depth the move picked is the same as the
+    serial search's. Pass a `concurrent.futures` `executor` to reuse a pool between moves;
+    otherwise one with `workers` processes (default: one per CPU) is made for this search.
+    Workers open `tablebase` (a `tablebase.Tablebase`) themselves, from its path.
+    Positions in `book` (a `book.OpeningBook`) aren't searched at all, and the rest are scored by `evaluator`.
+    """
+    if book is not None:
+        result = book_move(book, board, player)
+        if result is not None: return result
+    if depth is None: depth = DEFAULT_DEPTH if time_budget is None else MAX_DEPTH
+    start = time.time()
+    moves = get_square_moves(board, player)
+    if len(moves) == 0: return SearchResult(None, MAX_PLY - WIN, 0, [], 0)
+    if len(moves) == 1: return Engine(tablebase = tablebase, quiescence = quiescence, evaluator = evaluator).search(board, player, 1)
+    tablebase_path = tablebase.path if tablebase is not None else None
+
+    position = encode_position(board, player)
+    pool = executor if executor is not None else concurrent.futures.ProcessPoolExecutor(workers)
+    try:
+        result, nodes = None, 0
+        # with a time budget, deepen one iteration at a time; otherwise go straight to `depth`
+        for iteration in range(1, depth + 1) if time_budget is not None else [depth]:
+            deadline = start + time_budget if time_budget is not None and iteration > 1 else None
+            jobs = [pool.submit(search_root_move, position, m, iteration, deadline, tablebase_path, quiescence, evaluator) for m in moves]
+            scored = [job.result() for job in jobs]
+            if None in scored: break
+            nodes += sum(s[1] for s in scored) + 1
+
+            # the best score wins, and ties go to the move generated first, as in `Engine.search_root`
+            best = max(range(len(moves)), key = lambda i: (scored[i][0], -i))
+            result = SearchResult(moves[best], scored[best][0], iteration, [moves[best]] + scored[best][2], nodes)
+            if WIN - abs(result.score) <= iteration: break
+            if time_budget is not None and time.time() - start >= time_budget: break
+    finally:
+        if executor is None: pool.shutdown()
+    return result._replace(nodes = nodes)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Play checkers in the terminal.')
+    parser.add_argument('--depth', type = int, help = 'how many plies the computer looks ahead (default %i)' % DEFAULT_DEPTH)
+    parser.add_argument('--time', type = float, help = 'seconds the computer may think per move; it searches as deep as it can in that time')
+    parser.add_argument('--workers', type = int, help = 'search on this many processes at once')
+    parser.add_argument('--tablebase', help = 'endgame tablebase file to look positions up in (see the tablebase command)')
+    parser.add_argument('--book', help = 'opening book file (default: opening.book, if there is one; see the book command)')
+    parser.add_argument('--quiescence', type = int, default = DEFAULT_QUIESCENCE,
+        help = 'plies past the search depth to follow captures for (default %(default)s; 0 turns it off)')
+    parser.add_argument('--quiet', action = 'store_true', help = 'don\'t draw the board (for computer-only games)')
+    parser.add_argument('--diff', action = 'store_true', help = 'redraw only the squares that change, for watching on a terminal')
+    parser.add_argument('--log', help = 'file to append a JSON line to for every computer move, with search statistics')
+    parser.add_argument('--batch-eval', action = 'store_true', help = 'score leaves in batches with NumPy')
+    parser.add_argument('--eval', help = 'JSON file of evaluation weights (see Evaluator and the tune command)')
+    parser.add_argument('--no-book', action = 'store_true', help = 'search the opening instead of using an opening book')
+    commands = parser.add_subparsers(dest = 'command', title = 'commands', metavar = 'COMMAND')
+
+    import bench, book, selfplay, server, tablebase, tuning
+    selfplay.add_arguments(commands.add_parser('selfplay', help = 'play engine-vs-engine games without a board or prompts'))
+    tablebase.add_arguments(commands.add_parser('tablebase', help = 'solve the endgames with a few pieces left and write them to a file'))
+    book.add_arguments(commands.add_parser('book', help = 'search the first few plies deeply and write an opening book'))
+    bench.add_arguments(commands.add_parser('bench', help = 'count moves and time searches, and compare with a baseline'))
+    server.add_arguments(commands.add_parser('serve', help = 'host many games at once over a line-based protocol'))
+    tuning.add_arguments(commands.add_parser('tune', help = 'fit evaluation weights to the outcomes of recorded games'))
+
+    args = parser.parse_args()
+    if args.command == 'selfplay':
+        selfplay.run_command(args)
+        sys.exit()
+    if args.command == 'tablebase':
+        tablebase.run_command(args)
+        sys.exit()
+    if args.command == 'book':
+        book.run_command(args)
+        sys.exit()
+    if args.command == 'bench':
+        bench.run_command(args)
+        sys.exit()
+    if args.command == 'serve':
+        server.run_command(args)
+        sys.exit()
+    if args.command == 'tune':
+        tuning.run_command(args)
+        sys.exit()
+
+    endgames = tablebase.Tablebase(args.tablebase) if args.tablebase else None
+    book_path = args.book or (book.DEFAULT_PATH if os.path.exists(book.DEFAULT_PATH) else None)
+    openings = book.OpeningBook(book_path) if book_path and not args.no_book else None
+    evaluator = Evaluator.load(args.eval) if args.eval else None
+    engine = Engine(tablebase = endgames, book = openings, batch = args.batch_eval, trace = args.log is not None,
+                    quiescence = args.quiescence, evaluator = evaluator)
+    cache = engine.cache
+    executor = concurrent.futures.ProcessPoolExecutor(args.workers) if args.workers else None
+    log = open(args.log, 'a') if args.log else None
+    def think(board, player):
+        start = time.time()
+        if executor is not None:
+            result = parallel_search(board, player, args.depth, args.time, executor = executor, tablebase = endgames, book = openings,
+                                     quiescence = args.quiescence, evaluator = evaluator)
         else:
-            copy_moves_so_far = moves_so_far[:]
-            copy_moves_so_far.append(m)
-            next_move = get_best_move(opponent_moved_board, recurse_depth + 1, copy_moves_so_far, maximum)
-            if next_move[1] <= minimum: return next_move + moves_so_far
-            if next_move[1] <= maximum:
-                maximum = next_move[1]
-                boards.append(next_move)
-    if boards == []:
-        return [0,1337] + moves_so_far
-    best_board = boards[0]
-    for b in boards:
-        if b[1] < best_board[1]: best_board = b  #less than sign because human has opposite goal
-    return best_board + moves_so_far
-
-def get_best_jump(board, player, from_coord):
-
-    coords = []
-
-    while True:
-
-        moves = get_valid_moves(board, player)
-        if from_coord not in moves[0]: break
-        
-        test_board = board.deepcopy()
-
-        boards = []
-        test_moves = []
-
-        from_y, from_x = 'ABCDEFGH'.index(from_coord[0]), int(from_coord[1])
-
-        if test_board.data[from_x][from_y] is None:
-            return [coords, board]
-        elif test_board.data[from_x][from_y].king:
-            if from_x < 6 and from_y > 1 and board.data[from_x + 2][from_y - 2] is None:
-                if is_capture(board, player, xy_to_coords(from_x, from_y), xy_to_coords(from_x + 2, from_y - 2)):
-                    next_move = test_board.move(player, xy_to_coords(from_x, from_y), xy_to_coords(from_x + 2, from_y - 2))
-                    if next_move[0]:
-                        boards.append(next_move[1])
-                        test_moves.append(xy_to_coords(from_x + 2, from_y - 2))
-                        
-            if from_x < 6 and from_y < 6 and board.data[from_x + 2][from_y + 2] is None:
-                if is_capture(board, player, xy_to_coords(from_x, from_y), xy_to_coords(from_x + 2, from_y + 2)):
-                    next_move = test_board.move(player, xy_to_coords(from_x, from_y), xy_to_coords(from_x + 2, from_y + 2))
-                    if next_move[0]:
-                        boards.append(next_move[1])
-                        test_moves.append(xy_to_coords(from_x + 2, from_y + 2))
-                        
-            if from_x > 1 and from_y < 6 and board.data[from_x - 2][from_y + 2] is None:
-                if is_capture(board, player, xy_to_coords(from_x, from_y), xy_to_coords(from_x - 2, from_y + 2)):
-                    next_move = test_board.move(player, xy_to_coords(from_x, from_y), xy_to_coords(from_x - 2, from_y + 2))
-                    if next_move[0]:
-                        boards.append(next_move[1])
-                        test_moves.append(xy_to_coords(from_x - 2, from_y + 2))
-                        
-            if from_x > 1 and from_y > 1 and board.data[from_x - 2][from_y - 2] is None:
-                if is_capture(board, player, xy_to_coords(from_x, from_y), xy_to_coords(from_x - 2, from_y - 2)):
-                    next_move = test_board.move(player, xy_to_coords(from_x, from_y), xy_to_coords(from_x - 2, from_y - 2))
-                    if next_move[0]:
-                        boards.append(next_move[1])
-                        test_moves.append(xy_to_coords(from_x - 2, from_y - 2))
+            result = engine.search(board, player, args.depth, args.time)
+        if log is not None: log_search(log, player, result, time.time() - start)
+        return result
+
+    renderer = DiffRenderer() if args.diff else None
+    def show(board, player):
+        if args.quiet: return
+        if renderer is None:
+            print(board.render(player))
         else:
-            capture = 2 if player is Checker.PLAYER_ONE else -2
-            can_move_forwards = from_x < 6 if player == Checker.PLAYER_ONE else from_x > 1
-            if can_move_forwards and from_y > 1 and board.data[from_x + capture][from_y - 2] is None:
-                if is_capture(board, player, xy_to_coords(from_x, from_y), xy_to_coords(from_x + capture, from_y - 2)):
-                    next_move = test_board.move(player, xy_to_coords(from_x, from_y), xy_to_coords(from_x + capture, from_y - 2))
-                    if next_move[0]:
-                        boards.append(next_move[1])
-                        test_moves.append(xy_to_coords(from_x + capture, from_y - 2))
-                        
-            if can_move_forwards and from_y < 6 and board.data[from_x + capture][from_y + 2] is None:
-                if is_capture(board, player, xy_to_coords(from_x, from_y), xy_to_coords(from_x + capture, from_y + 2)):
-                    next_move = test_board.move(player, xy_to_coords(from_x, from_y), xy_to_coords(from_x + capture, from_y + 2))
-                    if next_move[0]:
-                        boards.append(next_move[1])
-                        test_moves.append(xy_to_coords(from_x + capture, from_y + 2))
-
-        if len(boards) == 0:
-            #if ch: print('true')
-            #print(board.render(Checker.PLAYER_ONE))
-            return [coords, board]
-
-        move_evals = []
-        for b in boards:
-            move_evals.append(eval_game_state(b))
-
-        min_max = move_evals[0]
-        for e in move_evals:
-            if player is Checker.PLAYER_ONE and min_max > e: min_max = e
-            if player is Checker.PLAYER_TWO and min_max < e: min_max = e
-
-        board = boards[move_evals.index(min_max)]
-        from_coord = test_moves[move_evals.index(min_max)]
-        coords.append(from_coord)
-
-    return [coords, board]
+            sys.stdout.write(renderer.render(board, player))
+            sys.stdout.flush()
 
-if __name__ == '__main__':
     players = input('Enter number of players (0, 1, 2): ')
     while players not in ['0','1', '2']:
         players = input('Invalid number of players. Try again: ')
@@ -486,42 +1420,42 @@ if __name__ == '__main__':
     if players == '0':
         board = Board()
         while True:
-            print(board.render(Checker.PLAYER_ONE))
-            if len(get_valid_moves(board, Checker.PLAYER_ONE)) is 0:
+            show(board, Checker.PLAYER_ONE)
+            if len(cache.moves(board, Checker.PLAYER_ONE)) == 0:
                 print('Player 2 wins')
                 break
-            move = get_o_best_move(board)
-            board = comp_move(board, Checker.PLAYER_ONE, move[len(move)-1])
-            print(board.render(Checker.PLAYER_ONE))  #disabled board rotation
-            if len(get_valid_moves(board, Checker.PLAYER_TWO)) is 0:
+            result = think(board, Checker.PLAYER_ONE)
+            board = comp_move(board, Checker.PLAYER_ONE, result.move)
+            show(board, Checker.PLAYER_ONE)  #disabled board rotation
+            if len(cache.moves(board, Checker.PLAYER_TWO)) == 0:
                 print('Player 1 wins')
                 break
-            move = get_best_move(board)
-            board = comp_move(board, Checker.PLAYER_TWO, move[len(move)-1])
+            result = think(board, Checker.PLAYER_TWO)
+            board = comp_move(board, Checker.PLAYER_TWO, result.move)
     elif players == '1':
         board = Board()
         while True:
-            print(board.render(Checker.PLAYER_ONE))
-            if len(get_valid_moves(board, Checker.PLAYER_ONE)) is 0:
+            show(board, Checker.PLAYER_ONE)
+            if len(cache.moves(board, Checker.PLAYER_ONE)) == 0:
                 print('Player 2 wins')
                 break
-            board = input_and_move(Checker.PLAYER_ONE, board)
-            print(board.render(Checker.PLAYER_ONE))
-            if len(get_valid_moves(board, Checker.PLAYER_TWO)) is 0:
+            board = input_and_move(Checker.PLAYER_ONE, board, cache)
+            show(board, Checker.PLAYER_ONE)
+            if len(cache.moves(board, Checker.PLAYER_TWO)) == 0:
                 print('Player 1 wins')
                 break
-            move = get_best_move(board)
-            board = comp_move(board, Checker.PLAYER_TWO, move[len(move)-1])
+            result = think(board, Checker.PLAYER_TWO)
+            board = comp_move(board, Checker.PLAYER_TWO, result.move)
     else:
         board = Board()
         while True:
-            print(board.render(Checker.PLAYER_ONE))
-            if len(get_valid_moves(board, Checker.PLAYER_ONE)) is 0:
+            show(board, Checker.PLAYER_ONE)
+            if len(cache.moves(board, Checker.PLAYER_ONE)) == 0:
                 print('Player 2 wins')
                 break
-            board = input_and_move(Checker.PLAYER_ONE, board)
-            print(board.render(Checker.PLAYER_TWO))
-            if len(get_valid_moves(board, Checker.PLAYER_TWO)) is 0:
+            board = input_and_move(Checker.PLAYER_ONE, board, cache)
+            show(board, Checker.PLAYER_TWO)
+            if len(cache.moves(board, Checker.PLAYER_TWO)) == 0:
                 print('Player 1 wins')
                 break
-            board = input_and_move(Checker.PLAYER_TWO, board)
+            board = input_and_move(Checker.PLAYER_TWO, board, cache)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+"""
+Game records: an append-only file of games, each some headers and a list of moves, that can be read
+back one game at a time however many there are.
+
+The file starts with MAGIC and a version; after that, games are written back to back, each as
+RECORD (the lengths of what follows), the headers as a JSON object, the starting position as
+`checkers.encode_position` bytes, and the moves, each a byte giving its number of squares and then
+a byte per square index. Each game goes out in one write, and a game cut short at the end of the
+file (say, by a crash while appending) is skipped when reading, and cut off before the next one is
+appended.
+"""
+
+import collections
+import json
+import struct
+
+from checkers import Board, Checker, POSITION, decode_position, encode_position, opponent
+
+MAGIC = b'CKGR'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sH')    # magic, version
+RECORD = struct.Struct('<IHI')         # headers length, number of moves, moves length
+
+GameRecord = collections.namedtuple('GameRecord', ['headers', 'start', 'moves'])
+GameRecord.__doc__ = 'A game read from a record file: headers (a dict), start (`encode_position` bytes) and moves (tuples of square indices).'
+
+def encode_moves(moves):
+    data = bytearray()
+    for move in moves:
+        data.append(len(move))
+        data.extend(move)
+    return data
+
+def decode_moves(data, count):
+    moves, i = [], 0
+    for _ in range(count):
+        moves.append(tuple(data[i + 1:i + 1 + data[i]]))
+        i += 1 + data[i]
+    return moves
+
+def complete_length(f, path):
+    """
+    How many bytes at the start of an open record file hold its header and whole games; anything
+    after that is a game cut short. Reads only the records' lengths, skipping over the games.
+    """
+    f.seek(0, 2)
+    size = f.tell()
+    f.seek(0)
+    head = f.read(FILE_HEADER.size)
+    if len(head) < FILE_HEADER.size: return 0
+    magic, version = FILE_HEADER.unpack(head)
+    if magic != MAGIC or version != VERSION: raise ValueError('%s is not a game record file' % path)
+    end = FILE_HEADER.size
+    while True:
+        head = f.read(RECORD.size)
+        if len(head) < RECORD.size: return end
+        header_length, _, moves_length = RECORD.unpack(head)
+        following = end + RECORD.size + header_length + POSITION.size + moves_length
+        if following > size: return end
+        f.seek(following)
+        end = following
+
+class RecordWriter:
+    """Appends games to a record file, which is made if it isn't there."""
+
+    # constructor
+    def __init__(self, path):
+        """Opens `path` for appending, first cutting off a game left unfinished at its end."""
+        self.path = path
+        self.file = open(path, 'a+b')
+        end = complete_length(self.file, path)
+        self.file.truncate(end)
+        if end == 0:
+            self.file.write(FILE_HEADER.pack(MAGIC, VERSION))
+            self.file.flush()
+
+    def write(self, moves, headers = None, board = None, player = Checker.PLAYER_ONE):
+        """Appends a game: its moves (tuples of square indices) from `board` (default: the start) with `player` to move first."""
+        header = json.dumps(headers or {}).encode('utf-8')
+        start = encode_position(board if board is not None else Board(), player)
+        data = encode_moves(moves)
+        self.file.write(RECORD.pack(len(header), len(moves), len(data)) + header + start + data)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_games(path):
+    """Yields every game in a record file as a GameRecord, reading one game at a time."""
+    with open(path, 'rb') as f:
+        head = f.read(FILE_HEADER.size)
+        if len(head) < FILE_HEADER.size: return
+        magic, version = FILE_HEADER.unpack(head)
+        if magic != MAGIC or version != VERSION: raise ValueError('%s is not a game record file' % path)
+        while True:
+            head = f.read(RECORD.size)
+            if len(head) < RECORD.size: return
+            header_length, count, moves_length = RECORD.unpack(head)
+            body = f.read(header_length + POSITION.size + moves_length)
+            if len(body) < header_length + POSITION.size + moves_length: return
+            yield GameRecord(json.loads(body[:header_length].decode('utf-8')),
+                             body[header_length:header_length + POSITION.size],
+                             decode_moves(body[header_length + POSITION.size:], count))
+
+def replay(game):
+    """
+    Yields (board, player, move) for every move of a GameRecord, with `move` not yet played on `board`.
+    It's the same board each time, played on in place.
+    """
+    board, player = decode_position(game.start)
+    for move in game.moves:
+        yield board, player, move
+        board.apply(player, move)
+        player = opponent(player)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+"""Headless engine-vs-engine games, played in bulk on a pool of processes."""
+
+import concurrent.futures
+import json
+import random
+import sys
+import time
+
+from checkers import Checker, Board, Engine, Evaluator, coords_to_square, get_square_moves, move_to_coords, opponent
+from records import RecordWriter
+from tablebase import Tablebase
+
+def play_game(one, two, max_plies = 200, random_plies = 0, seed = None, tablebase = None, evals = (None, None)):
+    """
+    Plays one game between two engine settings, given as dicts of `Engine.search` keyword
+    arguments (e.g. {'depth': 4} or {'time_budget': 0.2}). The first `random_plies` plies are
+    picked at random (seeded by `seed`) so that games differ; after `max_plies` the game is a draw.
+    Both engines use the endgame tablebase file at `tablebase`, if given, and each scores positions
+    by the weights in its file in `evals` (see `checkers.Evaluator`), if given.
+    Returns a dict with the moves, the winner ('one', 'two' or None), and per-move times and nodes.
+    """
+    rng = random.Random(seed)
+    board = Board()
+    endgames = Tablebase(tablebase) if tablebase is not None else None
+    evaluators = [Evaluator.load(path) if path is not None else None for path in evals]
+    engines = {Checker.PLAYER_ONE: Engine(tablebase = endgames, evaluator = evaluators[0]),
+               Checker.PLAYER_TWO: Engine(tablebase = endgames, evaluator = evaluators[1])}
+    settings = {Checker.PLAYER_ONE: one, Checker.PLAYER_TWO: two}
+    player = Checker.PLAYER_ONE
+    moves, times, nodes = [], [], []
+    winner = None
+
+    while len(moves) < max_plies:
+        legal = get_square_moves(board, player)
+        if len(legal) == 0:
+            winner = opponent(player)
+            break
+        start = time.time()
+        if len(moves) < random_plies:
+            move, searched = rng.choice(legal), 0
+        else:
+            result = engines[player].search(board, player, **settings[player])
+            move, searched = result.move, result.nodes
+        times.append(time.time() - start)
+        nodes.append(searched)
+        moves.append(move)
+        board.apply(player, move)
+        player = opponent(player)
+
+    return {
+        'seed': seed,
+        'one': one,
+        'two': two,
+        'winner': winner,
+        'plies': len(moves),
+        'moves': [move_to_coords(m) for m in moves],
+        'move_times': times,
+        'nodes': nodes,
+    }
+
+def run_selfplay(games, one, two, output, workers = None, max_plies = 200, random_plies = 4, seed = 0, tablebase = None, records = None,
+                 evals = (None, None)):
+    """
+    Plays `games` games of `one` against `two` (see `play_game`) on `workers` processes, writing each
+    result to `output` (a file object) as a line of JSON as soon as it finishes, and to `records`
+    (a `records.RecordWriter`) too, if given.
+    Returns a summary: wins for each side, draws, games/sec and nodes/sec.
+    """
+    start = time.time()
+    summary = {'games': 0, 'one': 0, 'two': 0, 'draws': 0, 'plies': 0, 'nodes': 0}
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        jobs = [pool.submit(play_game, one, two, max_plies, random_plies, seed + i, tablebase, evals) for i in range(games)]
+        for job in concurrent.futures.as_completed(jobs):
+            game = job.result()
+            output.write(json.dumps(game) + '\n')
+            output.flush()
+            if records is not None:
+                headers = {key: game[key] for key in ['seed', 'one', 'two', 'winner', 'plies']}
+                records.write([tuple(coords_to_square(c) for c in move) for move in game['moves']], headers)
+            summary['games'] += 1
+            summary[game['winner'] or 'draws'] += 1
+            summary['plies'] += game['plies']
+            summary['nodes'] += sum(game['nodes'])
+
+    elapsed = time.time() - start
+    summary['seconds'] = elapsed
+    summary['games_per_second'] = summary['games'] / elapsed
+    summary['nodes_per_second'] = summary['nodes'] / elapsed
+    return summary
+
+def engine_settings(depth, time_budget):
+    """Turns command line options into `Engine.search` keyword arguments."""
+    settings = {}
+    if depth is not None: settings['depth'] = depth
+    if time_budget is not None: settings['time_budget'] = time_budget
+    return settings
+
+def add_arguments(parser):
+    """Adds the `selfplay` command's options to an argparse parser."""
+    parser.add_argument('-n', '--games', type = int, default = 100, help = 'number of games to play')
+    parser.add_argument('-o', '--output', default = '-', help = 'JSON lines file to write games to (default: standard output)')
+    parser.add_argument('--workers', type = int, help = 'processes to play on (default: one per CPU)')
+    parser.add_argument('--depth-one', type = int, help = 'search depth for player one')
+    parser.add_argument('--depth-two', type = int, help = 'search depth for player two')
+    parser.add_argument('--time-one', type = float, help = 'seconds per move for player one')
+    parser.add_argument('--time-two', type = float, help = 'seconds per move for player two')
+    parser.add_argument('--max-plies', type = int, default = 200, help = 'plies after which a game is a draw')
+    parser.add_argument('--random-plies', type = int, default = 4, help = 'plies played at random at the start of each game')
+    parser.add_argument('--seed', type = int, default = 0, help = 'seed for the random opening plies')
+    parser.add_argument('--tablebase', help = 'endgame tablebase file for both engines')
+    parser.add_argument('--records', help = 'game record file to append the games to as well')
+    parser.add_argument('--eval-one', help = 'JSON file of evaluation weights for player one (see the tune command)')
+    parser.add_argument('--eval-two', help = 'JSON file of evaluation weights for player two')
+
+def run_command(args):
+    """Runs the `selfplay` command."""
+    one = engine_settings(args.depth_one, args.time_one)
+    two = engine_settings(args.depth_two, args.time_two)
+    output = sys.stdout if args.output == '-' else open(args.output, 'a')
+    records = RecordWriter(args.records) if args.records else None
+    try:
+        summary = run_selfplay(args.games, one, two, output, args.workers, args.max_plies, args.random_plies, args.seed, args.tablebase, records,
+                               (args.eval_one, args.eval_two))
+    finally:
+        if output is not sys.stdout: output.close()
+        if records is not None: records.close()
+    print('%(games)i games: player 1 won %(one)i, player 2 won %(two)i, %(draws)i drawn' % summary, file = sys.stderr)
+    print('%.2f games/sec, %.0f nodes/sec, %.1f plies/game' % (summary['games_per_second'],
+        summary['nodes_per_second'], summary['plies'] / max(summary['games'], 1)), file = sys.stderr)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+"""
+A game server: many games at once over a line-based protocol on TCP or a Unix socket.
+
+Each request is one line, a command and its arguments separated by spaces, and gets one line back:
+`OK ...`, `ERR <message>`, or `BUSY` when every engine process is taken (try again later).
+
+    NEW                      start a game; replies OK <game> and the game's state
+    STATE <game>             OK <game> <status> <player to move> <board>
+    MOVES <game>             OK and the legal moves, e.g. A2-B3 C2-E4-C6
+    MOVE <game> A2 B3 ...    play a move for the side to move; replies with the new state
+    AI <game> [seconds]      have the engine play for the side to move; replies OK <move> <score> <depth> and the state
+    END <game>               forget the game
+    QUIT                     close the connection
+
+A game belongs to the connection that started it: other connections can't see or play it, and
+it ends when that connection closes.
+The status is `playing`, or the winner (`one` or `two`) once the side to move can't move. The board
+is 32 characters, one per dark square in square index order: ' ' (as '.'), o, O, x or X.
+The engine runs on a process pool shared by every game, so searches never hold up the event loop.
+"""
+
+import asyncio
+import concurrent.futures
+import itertools
+import math
+import os
+import sys
+
+from checkers import (Board, Checker, Engine, MAX_DEPTH, MoveCache, SQUARES, decode_position, encode_position,
+                      get_valid_moves, move_to_coords, opponent, valid_move)
+
+DEFAULT_PORT = 7557
+DEFAULT_TIME = 1.0
+DEFAULT_MAX_TIME = 10.0
+DEFAULT_MAX_GAMES = 1000
+
+worker_engine = None
+
+def think(position, time_budget, tablebase_path = None):
+    """
+    Runs in a worker process: searches a position, given as `encode_position` bytes, for at most
+    `time_budget` seconds. Returns (move, score, depth, nodes).
+    """
+    global worker_engine
+    if worker_engine is None or getattr(worker_engine.tablebase, 'path', None) != tablebase_path:
+        from tablebase import Tablebase
+        worker_engine = Engine(tablebase = Tablebase(tablebase_path) if tablebase_path is not None else None)
+    board, player = decode_position(position)
+    result = worker_engine.search(board, player, MAX_DEPTH, time_budget)
+    return result.move, result.score, result.depth, result.nodes
+
+class Game:
+    """One game on the server: its board, whose move it is, and who has won (if anyone)."""
+
+    # constructor
+    def __init__(self, number, cache):
+        """Starts game `number`, looking its legal moves up in `cache` (a `MoveCache`)."""
+        self.number = number
+        self.cache = cache
+        self.board = Board()
+        self.player = Checker.PLAYER_ONE
+        self.winner = None
+        # one request at a time may change the game
+        self.lock = asyncio.Lock()
+
+    def state(self):
+        """The game's state as a protocol line (without the OK)."""
+        squares = ''.join(Checker.character(self.board.data[x][y]) for x, y in SQUARES).replace(' ', '.')
+        return '%i %s %s %s' % (self.number, self.winner or 'playing', self.player, squares)
+
+    def play(self, coords):
+        """
+        Plays a move, given as a list of A0-style coordinates, for the side to move, checking each hop
+        with `Board.move`. Returns None, or an error message if the move isn't legal.
+        """
+        if self.winner is not None: return 'The game is over'
+        if not valid_move(coords): return 'That\'s not a move'
+        board = self.board.deepcopy()
+        for a, b in zip(coords, coords[1:]):
+            moved, message = board.move(self.player, a, b)
+            if not moved: return message
+        legal = get_valid_moves(self.board, self.player, self.cache)
+        if coords not in legal:
+            if len(legal[0]) > 2 or abs(int(legal[0][0][1]) - int(legal[0][1][1])) == 2:
+                return 'You must jump, and keep jumping while you can'
+            return 'That\'s not a legal move'
+        self.board = board
+        self.advance()
+
+    def advance(self):
+        """Passes the move to the other side, and ends the game if they can't move."""
+        self.player = opponent(self.player)
+        if len(self.cache.moves(self.board, self.player)) == 0: self.winner = opponent(self.player)
+
+class Server:
+    """Holds the games and the engine pool, and answers requests."""
+
+    # constructor
+    def __init__(self, workers = None, max_pending = None, max_games = DEFAULT_MAX_GAMES,
+                 time_budget = DEFAULT_TIME, max_time = DEFAULT_MAX_TIME, tablebase = None):
+        """
+        Makes a server with an engine pool of `workers` processes (default: one per CPU). At most
+        `max_pending` engine requests (default: two per worker) are taken at once; any more get BUSY.
+        AI requests search for `time_budget` seconds unless they ask otherwise, and never more than `max_time`.
+        The engines look positions up in `tablebase` (a `tablebase.Tablebase`), opening it themselves from its path.
+        """
+        workers = workers or os.cpu_count() or 1
+        self.workers = workers
+        self.pool = concurrent.futures.ProcessPoolExecutor(workers)
+        self.slots = asyncio.Semaphore(max_pending if max_pending is not None else 2 * workers)
+        self.games = {}
+        # games mostly go through the same openings, so their legal moves are shared
+        self.cache = MoveCache()
+        self.numbers = itertools.count(1)
+        self.max_games = max_games
+        self.time_budget = time_budget
+        self.max_time = max_time
+        self.tablebase_path = tablebase.path if tablebase is not None else None
+
+    async def handle(self, reader, writer):
+        """Serves one connection until it sends QUIT or hangs up, then ends the games it started."""
+        owned = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: break
+                words = line.decode('utf-8', 'replace').split()
+                if len(words) == 0: continue
+                if words[0].upper() == 'QUIT': break
+                try:
+                    reply = await self.request(words[0].upper(), words[1:], owned)
+                except (ValueError, IndexError):
+                    reply = 'ERR Bad request; see HELP'
+                writer.write((reply + '\n').encode('utf-8'))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for number in owned:
+                self.games.pop(number, None)
+            writer.close()
+
+    async def request(self, command, args, owned):
+        """Answers a request from a connection that owns the games numbered in `owned` (a set). Returns the reply line."""
+        if command == 'HELP': return 'OK NEW STATE MOVES MOVE AI END QUIT'
+        if command == 'NEW':
+            if len(self.games) >= self.max_games: return 'ERR Too many games'
+            game = Game(next(self.numbers), self.cache)
+            self.games[game.number] = game
+            owned.add(game.number)
+            return 'OK ' + game.state()
+
+        number = int(args[0])
+        game = self.games.get(number) if number in owned else None
+        if game is None: return 'ERR No such game'
+        if command == 'STATE': return 'OK ' + game.state()
+        if command == 'MOVES':
+            return 'OK ' + ' '.join('-'.join(move) for move in get_valid_moves(game.board, game.player, game.cache))
+        if command == 'END':
+            del self.games[game.number]
+            owned.discard(game.number)
+            return 'OK'
+        if command == 'MOVE':
+            async with game.lock:
+                error = game.play([coords.upper() for coords in args[1:]])
+            return 'ERR ' + error if error is not None else 'OK ' + game.state()
+        if command == 'AI':
+            budget = float(args[1]) if len(args) > 1 else self.time_budget
+            # NaN would slip through min() and never time out
+            if not (math.isfinite(budget) and budget > 0): return 'ERR The time must be a positive number of seconds'
+            budget = min(budget, self.max_time)
+            return await self.ai_move(game, budget)
+        return 'ERR Unknown command %s' % command
+
+    async def ai_move(self, game, budget):
+        """Has the engine play for the side to move in `game`, on the pool."""
+        # backpressure: say so straight away rather than queue behind searches that are already late
+        if self.slots.locked(): return 'BUSY'
+        async with self.slots, game.lock:
+            if game.winner is not None: return 'ERR The game is over'
+            position = encode_position(game.board, game.player)
+            loop = asyncio.get_running_loop()
+            try:
+                move, score, depth, nodes = await loop.run_in_executor(self.pool, think, position, budget, self.tablebase_path)
+            except Exception as e:
+                # a worker that died takes the pool with it, so start another for the requests to come
+                if isinstance(e, concurrent.futures.process.BrokenProcessPool):
+                    self.pool.shutdown(wait = False)
+                    self.pool = concurrent.futures.ProcessPoolExecutor(self.workers)
+                return 'ERR The engine failed: %s' % (str(e) or type(e).__name__)
+            game.board.apply(game.player, move)
+            game.advance()
+        return 'OK %s %g %i %s' % ('-'.join(move_to_coords(move)), score, depth, game.state())
+
+    def close(self):
+        self.pool.shutdown()
+
+async def serve(server, host = None, port = DEFAULT_PORT, unix = None):
+    """Listens on `unix` (a socket path) if given, otherwise on TCP `host`:`port`, until cancelled."""
+    if unix is not None:
+        listener = await asyncio.start_unix_server(server.handle, unix)
+    else:
+        listener = await asyncio.start_server(server.handle, host, port)
+    async with listener:
+        await listener.serve_forever()
+
+def add_arguments(parser):
+    """Adds the `serve` command's options to an argparse parser."""
+    parser.add_argument('--host', help = 'address to listen on (default: all)')
+    parser.add_argument('--port', type = int, default = DEFAULT_PORT, help = 'TCP port to listen on (default %(default)s)')
+    parser.add_argument('--unix', help = 'listen on this Unix socket path instead of TCP')
+    parser.add_argument('--workers', type = int, help = 'engine processes (default: one per CPU)')
+    parser.add_argument('--max-pending', type = int, help = 'engine requests taken at once before replying BUSY (default: two per worker)')
+    parser.add_argument('--max-games', type = int, default = DEFAULT_MAX_GAMES, help = 'games held at once (default %(default)s)')
+    parser.add_argument('--time', type = float, default = DEFAULT_TIME, help = 'seconds per engine move unless asked otherwise (default %(default)s)')
+    parser.add_argument('--max-time', type = float, default = DEFAULT_MAX_TIME, help = 'most seconds an engine move may be given (default %(default)s)')
+    parser.add_argument('--tablebase', help = 'endgame tablebase file for the engine')
+
+def run_command(args):
+    """Runs the `serve` command."""
+    # open the tablebase here, so that a bad file stops the server before it takes any games
+    endgames = None
+    if args.tablebase:
+        from tablebase import Tablebase
+        try:
+            endgames = Tablebase(args.tablebase)
+        except (OSError, ValueError) as e:
+            print('can\'t open the tablebase: %s' % e, file = sys.stderr)
+            sys.exit(1)
+    async def main():
+        server = Server(args.workers, args.max_pending, args.max_games, args.time, args.max_time, endgames)
+        try:
+            await serve(server, args.host, args.port, args.unix)
+        finally:
+            server.close()
+    print('serving on %s' % (args.unix or '%s:%i' % (args.host or '*', args.port)), file = sys.stderr)
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
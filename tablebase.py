@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+"""
+Endgame tablebases: every position with a few pieces left, solved by retrograde analysis.
+
+Positions are stored with the side to move as player one (a position with player two to move
+is turned around first), grouped by material: (player one's men, player one's kings, player two's
+men, player two's kings). Within a group every placement of the pieces has a perfect index, and
+the file holds one byte per index: 0 for a draw, otherwise the number of plies to the end plus one
+(odd plies: the side to move wins, even plies: it loses).
+"""
+
+import collections
+import itertools
+import math
+import mmap
+import struct
+import sys
+
+from checkers import Bitboard, Checker
+
+# file layout: header, then a directory entry per material group, then the values
+MAGIC = b'CKTB'
+VERSION = 1
+HEADER = struct.Struct('<4sHHI')      # magic, version, max pieces, number of groups
+DIRECTORY = struct.Struct('<4BQQ')    # material group, offset, size
+
+DEFAULT_PIECES = 3
+REVERSED_BYTES = [int('{:08b}'.format(i)[::-1], 2) for i in range(256)]
+
+def count(mask):
+    return bin(mask).count('1')
+
+def reverse_bits(mask):
+    """Reverses a 32-bit mask, which turns the board around (square s becomes square 31 - s)."""
+    return (REVERSED_BYTES[mask & 0xFF] << 24 | REVERSED_BYTES[mask >> 8 & 0xFF] << 16 |
+            REVERSED_BYTES[mask >> 16 & 0xFF] << 8 | REVERSED_BYTES[mask >> 24])
+
+def canonical(bitboard, player):
+    """
+    Returns the masks (men, kings, opponent's men, opponent's kings) of a position with `player`
+    to move, seen from player one's side of the board.
+    """
+    if player == Checker.PLAYER_ONE:
+        own, other, kings = bitboard.one, bitboard.two, bitboard.kings
+    else:
+        own, other, kings = reverse_bits(bitboard.two), reverse_bits(bitboard.one), reverse_bits(bitboard.kings)
+    return own & ~kings, own & kings, other & ~kings, other & kings
+
+def material(masks):
+    """The material group of a position: how many of each kind of piece there are."""
+    return tuple(count(mask) for mask in masks)
+
+def group_size(group):
+    """The number of ways to place the pieces of a material group."""
+    size, free = 1, 32
+    for pieces in group:
+        size *= math.comb(free, pieces)
+        free -= pieces
+    return size
+
+def index(masks):
+    """
+    The perfect index of a position within its material group: each kind of piece is ranked
+    as a combination of the squares the kinds before it left free.
+    """
+    result, occupied, free = 0, 0, 32
+    for mask in masks:
+        rank, pieces, rest = 0, 0, mask
+        while rest:
+            bit = rest & -rest
+            rest ^= bit
+            pieces += 1
+            # the square's position among the squares still free
+            rank += math.comb(bit.bit_length() - 1 - count(occupied & (bit - 1)), pieces)
+        result = result * math.comb(free, pieces) + rank
+        occupied |= mask
+        free -= pieces
+    return result
+
+class Tablebase:
+    """A tablebase file, memory-mapped so that looking a position up costs one read."""
+
+    # constants (Tablebase._____)
+    WIN = 1
+    DRAW = 0
+    LOSS = -1
+
+    # constructor
+    def __init__(self, path):
+        """Opens a tablebase file made by `build`."""
+        self.path = path
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+        magic, version, self.max_pieces, groups = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION: raise ValueError('%s is not a tablebase file' % path)
+        self.offsets = {}
+        for i in range(groups):
+            entry = DIRECTORY.unpack_from(self.data, HEADER.size + i * DIRECTORY.size)
+            self.offsets[entry[:4]] = entry[4]
+
+    def probe(self, board, player):
+        """
+        Looks up `board` with `player` to move. Returns (result, plies), where result is
+        Tablebase.WIN, DRAW or LOSS for `player` and plies is how long it takes with best play,
+        or None if the position has too many pieces.
+        """
+        masks = canonical(Bitboard.from_board(board), player)
+        offset = self.offsets.get(material(masks))
+        if offset is None: return None
+        value = self.data[offset + index(masks)]
+        if value == 0: return Tablebase.DRAW, 0
+        return (Tablebase.WIN if (value - 1) % 2 else Tablebase.LOSS), value - 1
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+def material_groups(max_pieces):
+    """
+    Every material group with both sides on the board and at most `max_pieces` pieces, in batches
+    that can be solved one after another: captures lead to fewer pieces and promotions to more
+    kings, so those come first. A group and its mirror image lead into each other, so they share a batch.
+    """
+    groups = [group for group in itertools.product(range(max_pieces + 1), repeat = 4)
+              if group[0] + group[1] > 0 and group[2] + group[3] > 0 and sum(group) <= max_pieces]
+    groups.sort(key = lambda group: (sum(group), -(group[1] + group[3]), group))
+    batches, seen = [], set()
+    for group in groups:
+        if group in seen: continue
+        mirror = group[2:] + group[:2]
+        batch = [group] if mirror == group else [group, mirror]
+        seen.update(batch)
+        batches.append(batch)
+    return batches
+
+def placements(group):
+    """Yields the masks of every placement of a material group's pieces where no man sits on its crowning row."""
+    allowed = [0x0FFFFFFF, Bitboard.FULL, 0xFFFFFFF0, Bitboard.FULL]
+    def place(kind, free):
+        if kind == 4:
+            yield ()
+            return
+        for chosen in itertools.combinations([s for s in free if allowed[kind] >> s & 1], group[kind]):
+            mask = 0
+            for square in chosen: mask |= 1 << square
+            for rest in place(kind + 1, [s for s in free if not mask >> s & 1]):
+                yield (mask,) + rest
+    return place(0, list(range(32)))
+
+def value_from(successors):
+    """
+    The stored value of a position, given the values of the positions its moves lead to
+    (as (array, index) pairs, or (None, 0) for a move that leaves the opponent with no pieces).
+    """
+    if len(successors) == 0: return 1 # no moves: lost right away
+    shortest_win, longest_loss, every_move_loses = None, 0, True
+    for array, i in successors:
+        value = 1 if array is None else array[i]
+        if value == 0:
+            every_move_loses = False
+        elif (value - 1) % 2 == 0:
+            # the opponent loses from there, so this position is won
+            if shortest_win is None or value < shortest_win: shortest_win = value
+        else:
+            longest_loss = max(longest_loss, value)
+    if shortest_win is not None: value = shortest_win + 1
+    elif every_move_loses: value = longest_loss + 1
+    else: return 0
+    while value > 255: value -= 2 # keep the parity, so the result stays right
+    return value
+
+def solve(batch, tables):
+    """Solves the material groups in `batch`, adding their values to `tables` (material group -> bytearray)."""
+    for group in batch: tables[group] = bytearray(group_size(group))
+
+    # play every move from every position once, noting where each one leads
+    positions, numbers = [], {}
+    for group in batch:
+        for masks in placements(group):
+            bitboard = Bitboard(masks[0] | masks[1], masks[2] | masks[3], masks[1] | masks[3])
+            successors = []
+            for move in bitboard.moves(Checker.PLAYER_ONE):
+                undo = bitboard.make(Checker.PLAYER_ONE, move)
+                after = canonical(bitboard, Checker.PLAYER_TWO)
+                bitboard.unmake(undo)
+                successors.append((material(after), index(after)) if after[0] | after[1] else None)
+            numbers[group, index(masks)] = len(positions)
+            positions.append((tables[group], index(masks), successors))
+
+    predecessors = [[] for _ in positions]
+    for n, (_, _, successors) in enumerate(positions):
+        for successor in successors:
+            if successor in numbers: predecessors[numbers[successor]].append(n)
+    links = [[(None, 0) if s is None else (tables[s[0]], s[1]) for s in successors] for _, _, successors in positions]
+
+    # retrograde analysis: keep re-solving positions whose successors changed until nothing changes
+    queue, queued = collections.deque(range(len(positions))), bytearray([1]) * len(positions)
+    while queue:
+        n = queue.popleft()
+        queued[n] = 0
+        array, i, _ = positions[n]
+        value = value_from(links[n])
+        if value != array[i]:
+            array[i] = value
+            for p in predecessors[n]:
+                if not queued[p]:
+                    queued[p] = 1
+                    queue.append(p)
+
+def build(path, max_pieces = DEFAULT_PIECES, progress = None):
+    """Solves every position with up to `max_pieces` pieces and writes the tablebase to `path`."""
+    tables = {}
+    for batch in material_groups(max_pieces):
+        solve(batch, tables)
+        if progress is not None: progress(batch)
+
+    groups = sorted(tables)
+    offset = HEADER.size + DIRECTORY.size * len(groups)
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, max_pieces, len(groups)))
+        for group in groups:
+            f.write(DIRECTORY.pack(*group, offset, len(tables[group])))
+            offset += len(tables[group])
+        for group in groups:
+            f.write(tables[group])
+
+def add_arguments(parser):
+    """Adds the `tablebase` command's options to an argparse parser."""
+    parser.add_argument('-o', '--output', default = 'endgame.tb', help = 'file to write the tablebase to')
+    parser.add_argument('--pieces', type = int, default = DEFAULT_PIECES,
+        help = 'solve every position with up to this many pieces (default %i; each one more takes far longer)' % DEFAULT_PIECES)
+
+def run_command(args):
+    """Runs the `tablebase` command."""
+    def progress(batch):
+        print('solved %s' % ', '.join('%i+%iK v %i+%iK' % group for group in batch), file = sys.stderr)
+    build(args.output, args.pieces, progress)
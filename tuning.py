@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+"""
+Fitting the evaluation's weights (see `checkers.Evaluator`) to how recorded games turned out.
+
+Every quiet position of every game (no capture for the side to move) becomes a row of features,
+one per weight: for each side, the men, their rings out from the middle and rows advanced, the
+kings and their rings out, player one's counted negative, so that the dot product of a row and the
+weights is exactly the `eval_game_state` score. A logistic regression then fits the weights so that
+sigmoid(score / scale) predicts the game's result for player two (1 won, 0.5 drawn, 0 lost).
+The features are extracted and the regression solved with NumPy, all positions at once. NumPy is
+imported by the functions that use it, so that the `tune` command costs nothing until it runs.
+"""
+
+import json
+import sys
+
+from checkers import Bitboard, Board, Checker, Evaluator, coords_to_square, decode_position, opponent
+from records import MAGIC, read_games
+
+FEATURES = sorted(Evaluator.DEFAULTS)
+DEFAULT_SCALE = 4.0
+DEFAULT_SKIP_PLIES = 4
+DEFAULT_L2 = 1e-4
+DEFAULT_ITERATIONS = 50
+
+def feature_table():
+    """
+    A (4, 32, F) array: what a piece of each of `batch_eval.KINDS` on each square adds to each feature.
+    It is each feature's weight table on its own, so features and `Evaluator` agree by construction.
+    """
+    import numpy
+    from batch_eval import square_weights
+    zeros = dict.fromkeys(FEATURES, 0.0)
+    return numpy.stack([square_weights(Evaluator(dict(zeros, **{name: 1.0})).table) for name in FEATURES], axis = -1)
+
+def game_positions(path, skip_plies = 0):
+    """
+    Yields (masks, result) for every game in a file: `masks`, a list of the (one, two, kings) masks
+    of the game's quiet positions after the first `skip_plies` plies, and `result`, 1.0, 0.5 or 0.0 for player two winning, drawing or losing.
+    The file is a game record file (see `records`) or `selfplay`'s JSON lines; a game won if the side to
+    move at the end has no moves, and drawn otherwise.
+    """
+    with open(path, 'rb') as f:
+        recorded = f.read(len(MAGIC)) == MAGIC
+    if recorded:
+        games = ((decode_position(game.start), game.moves) for game in read_games(path))
+    else:
+        games = (((Board(), Checker.PLAYER_ONE), [tuple(coords_to_square(c) for c in move) for move in json.loads(line)['moves']])
+                 for line in open(path) if line.strip())
+    for (board, player), moves in games:
+        bitboard = Bitboard.from_board(board)
+        masks = []
+        for ply, move in enumerate(moves + [None]):
+            if ply >= skip_plies and not bitboard.has_captures(player): masks.append((bitboard.one, bitboard.two, bitboard.kings))
+            if move is None: break
+            bitboard.make(player, move)
+            player = opponent(player)
+        if len(bitboard.moves(player)) > 0: result = 0.5
+        else: result = 1.0 if player == Checker.PLAYER_ONE else 0.0
+        yield masks, result
+
+def extract(paths, skip_plies = DEFAULT_SKIP_PLIES):
+    """
+    Reads the positions of every game in `paths`, leaving out each game's first `skip_plies` plies
+    (played at random by `selfplay`). Returns (features, results): an (N, F) float64 array and N results.
+    """
+    import numpy
+    from batch_eval import kinds_array
+    masks, results = [], []
+    for path in paths:
+        for game, result in game_positions(path, skip_plies):
+            masks.extend(game)
+            results.extend([result] * len(game))
+    if len(masks) == 0: return numpy.zeros((0, len(FEATURES))), numpy.zeros(0)
+    kinds = kinds_array(numpy.array(masks, dtype = numpy.uint32)).astype(numpy.float64)
+    return numpy.einsum('nks,ksf->nf', kinds, feature_table()), numpy.array(results)
+
+def sigmoid(z):
+    import numpy
+    # written this way, large scores of either sign don't overflow
+    return numpy.exp(-numpy.logaddexp(0, -z))
+
+def loss(features, results, weights, scale = DEFAULT_SCALE):
+    """The mean log loss of predicting `results` by sigmoid(features . weights / scale)."""
+    import numpy
+    z = features @ weights / scale
+    return float(numpy.mean(results * numpy.logaddexp(0, -z) + (1 - results) * numpy.logaddexp(0, z)))
+
+def fit(features, results, weights, scale = DEFAULT_SCALE, l2 = DEFAULT_L2, iterations = DEFAULT_ITERATIONS):
+    """
+    Fits the logistic regression by Newton's method, starting from `weights` (an array of F), with an
+    L2 penalty of `l2` on the weights. Each step is halved until it lowers the penalised loss, since a
+    full Newton step can overshoot far from the optimum. Returns the fitted weights.
+    """
+    import numpy
+    def objective(weights):
+        return loss(features, results, weights, scale) + l2 / 2 * float(weights @ weights)
+    n = len(results)
+    identity = numpy.eye(len(weights))
+    current = objective(weights)
+    for _ in range(iterations):
+        p = sigmoid(features @ weights / scale)
+        gradient = features.T @ (p - results) / (n * scale) + l2 * weights
+        hessian = (features * (p * (1 - p))[:, None]).T @ features / (n * scale * scale) + l2 * identity
+        step = numpy.linalg.solve(hessian, gradient)
+        while numpy.abs(step).max() >= 1e-6:
+            trial = objective(weights - step)
+            if trial < current: break
+            step = step / 2
+        else:
+            break # no step that small lowers the loss any more
+        weights, current = weights - step, trial
+    return weights
+
+def tune(paths, start = None, scale = DEFAULT_SCALE, skip_plies = DEFAULT_SKIP_PLIES, l2 = DEFAULT_L2):
+    """
+    Fits an `Evaluator` to the games in `paths`, starting from `start` (default: the default weights).
+    Returns (evaluator, report), the report giving the positions used and the loss before and after.
+    """
+    import numpy
+    start = start if start is not None else Evaluator()
+    features, results = extract(paths, skip_plies)
+    if len(results) == 0: raise ValueError('No positions to tune on')
+    initial = numpy.array([start.weights[name] for name in FEATURES])
+    # the evaluator rounds the weights as it would any others
+    evaluator = Evaluator(dict(zip(FEATURES, fit(features, results, initial, scale, l2).tolist())))
+    fitted = numpy.array([evaluator.weights[name] for name in FEATURES])
+    return evaluator, {
+        'positions': len(results),
+        'loss_before': loss(features, results, initial, scale),
+        'loss_after': loss(features, results, fitted, scale),
+    }
+
+def add_arguments(parser):
+    """Adds the `tune` command's options to an argparse parser."""
+    parser.add_argument('games', nargs = '+', help = 'game record files (selfplay --records) or selfplay JSON lines files')
+    parser.add_argument('-o', '--output', default = 'eval.json', help = 'JSON file to write the weights to (default %(default)s)')
+    parser.add_argument('--start', help = 'JSON weights file to start from (default: the default weights)')
+    parser.add_argument('--scale', type = float, default = DEFAULT_SCALE,
+        help = 'score that counts for as much as e to 1 odds of winning (default %(default)s)')
+    parser.add_argument('--skip-plies', type = int, default = DEFAULT_SKIP_PLIES, help = 'leave out the first plies of each game (default %(default)s)')
+    parser.add_argument('--l2', type = float, default = DEFAULT_L2, help = 'L2 penalty on the weights (default %(default)s)')
+
+def run_command(args):
+    """Runs the `tune` command."""
+    try:
+        import numpy
+    except ImportError:
+        print('tuning needs NumPy', file = sys.stderr)
+        sys.exit(1)
+    try:
+        start = Evaluator.load(args.start) if args.start else Evaluator()
+        evaluator, report = tune(args.games, start, args.scale, args.skip_plies, args.l2)
+    except ValueError as e:
+        print('can\'t tune: %s' % e, file = sys.stderr)
+        sys.exit(1)
+    for name in FEATURES:
+        print('%-12s %8.4f -> %8.4f' % (name, start.weights[name], evaluator.weights[name]))
+    print('%(positions)i positions, log loss %(loss_before).4f -> %(loss_after).4f' % report)
+    if report['loss_after'] >= report['loss_before']:
+        print('the fit is no better than the weights it started from; not writing %s' % args.output, file = sys.stderr)
+        sys.exit(1)
+    evaluator.save(args.output)
+    print('wrote %s' % args.output)